@@ -15,6 +15,11 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Worker threads for independent git subprocess calls
+_GIT_WORKERS = 4
 
 
 @dataclass
@@ -360,22 +365,12 @@ class GitIntegrator:
             return patterns
         
         try:
-            # Collect function names from recent commits
+            # Collect function names from recent commits, one file per worker
             all_functions = []
             
-            for file_path in file_paths:
-                history = self.get_file_history(file_path, max_commits=5)
-                
-                for commit in history:
-                    content = self.get_file_content_at_commit(file_path, commit['hash'])
-                    if content:
-                        # Detect language
-                        ext = Path(file_path).suffix
-                        language = self._detect_language_from_extension(ext)
-                        
-                        if language:
-                            functions = self.extract_functions_from_code(content, language, file_path)
-                            all_functions.extend(functions)
+            with ThreadPoolExecutor(max_workers=_GIT_WORKERS) as pool:
+                for functions in pool.map(self._recent_functions, file_paths):
+                    all_functions.extend(functions)
             
             # Analyze naming patterns
             naming_patterns = self._analyze_naming_conventions(all_functions)
@@ -395,6 +390,23 @@ class GitIntegrator:
             print(f"Error detecting naming patterns: {e}")
             return []
     
+    def _recent_functions(self, file_path: str) -> List[Dict[str, Any]]:
+        """Functions defined in file_path at each of its last few commits"""
+        functions = []
+        history = self.get_file_history(file_path, max_commits=5)
+        
+        for commit in history:
+            content = self.get_file_content_at_commit(file_path, commit['hash'])
+            if content:
+                # Detect language
+                ext = Path(file_path).suffix
+                language = self._detect_language_from_extension(ext)
+                
+                if language:
+                    functions.extend(self.extract_functions_from_code(content, language, file_path))
+        
+        return functions
+    
     def _detect_language_from_extension(self, extension: str) -> Optional[str]:
         """Detect language from file extension"""
         ext_map = {
@@ -458,18 +470,27 @@ class GitIntegrator:
             return context
         
         try:
-            # Get file history
-            context['file_history'] = self.get_file_history(file_path, max_commits=10)
-            
-            # Analyze function reuse patterns
-            context['function_patterns'] = self.analyze_function_reuse(file_path, language)
-            
-            # Get naming patterns from related files
-            related_files = self._find_related_files(file_path, language)
-            context['naming_patterns'] = self.detect_naming_patterns(related_files)
+            # The lookups below only wait on their own git subprocesses, so
+            # they run side by side
+            with ThreadPoolExecutor(max_workers=_GIT_WORKERS) as pool:
+                # Get file history
+                file_history = pool.submit(self.get_file_history, file_path, 10)
+                
+                # Analyze function reuse patterns
+                function_patterns = pool.submit(self.analyze_function_reuse, file_path, language)
+                
+                # Get naming patterns from related files
+                naming_patterns = pool.submit(
+                    lambda: self.detect_naming_patterns(self._find_related_files(file_path, language))
+                )
+                
+                # Get recent changes
+                recent_changes = pool.submit(self._get_recent_file_changes, file_path)
             
-            # Get recent changes
-            context['recent_changes'] = self._get_recent_file_changes(file_path)
+            context['file_history'] = file_history.result()
+            context['function_patterns'] = function_patterns.result()
+            context['naming_patterns'] = naming_patterns.result()
+            context['recent_changes'] = recent_changes.result()
             
             # Generate suggestions based on context
             context['suggestions'] = self._generate_context_suggestions(context)
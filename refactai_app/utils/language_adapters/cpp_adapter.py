@@ -481,6 +481,10 @@ class CppAdapter:
                 "No C/C++ compiler found - syntax validation disabled"
             )
     
+    def reset(self):
+        """Forget C/C++ changes recorded for the previous file"""
+        self.transformer.changes_made.clear()
+    
     def _find_compiler(self, compiler_name: str) -> Optional[str]:
         """Find C/C++ compiler executable"""
         try:
@@ -418,6 +418,10 @@ class JavaAdapter:
                 "javac not found - Java syntax validation disabled"
             )
     
+    def reset(self):
+        """Forget Java changes recorded for the previous file"""
+        self.transformer.changes_made.clear()
+    
     def _find_javac_executable(self) -> Optional[str]:
         """Find javac executable"""
         try:
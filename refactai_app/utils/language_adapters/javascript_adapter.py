@@ -305,6 +305,10 @@ class JavaScriptAdapter:
                 "Node.js not found - JavaScript syntax validation disabled"
             )
     
+    def reset(self):
+        """Forget JavaScript changes recorded for the previous file"""
+        self.transformer.changes_made.clear()
+    
     def _find_node_executable(self) -> Optional[str]:
         """Find Node.js executable"""
         try:
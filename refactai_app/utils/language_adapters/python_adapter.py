@@ -47,6 +47,29 @@ class PythonSymbol:
             self.arguments = []
 
 
+def _compose_renames(renames: List[Tuple[str, str]]) -> Dict[str, str]:
+    """Final name for every name that applying renames one after another would touch"""
+    final_names = {}
+    for old_name, new_name in renames:
+        # Names already renamed to old_name move on with it
+        for name, target in final_names.items():
+            if target == old_name:
+                final_names[name] = new_name
+        final_names.setdefault(old_name, new_name)
+    return final_names
+
+
+def _applied_renames(renames: List[Tuple[str, str]], seen: set) -> List[bool]:
+    """Which renames change the code when applied in order, given the original names present"""
+    applied = [False] * len(renames)
+    for name in seen:
+        for i, (old_name, new_name) in enumerate(renames):
+            if name == old_name:
+                applied[i] = applied[i] or new_name != old_name
+                name = new_name
+    return applied
+
+
 class PythonASTTransformer(ast.NodeTransformer):
     """AST transformer for Python code refactoring"""
     
@@ -330,6 +353,14 @@ class PythonAdapter:
                     "libcst not available - some advanced transformations disabled"
                 )
     
+    def reset(self):
+        """Clear symbols, imports and changes tracked for the previous file"""
+        self.ast_transformer.changes_made.clear()
+        self.ast_transformer.symbol_table.clear()
+        self.ast_transformer.imports.clear()
+        if self.cst_transformer is not None:
+            self.cst_transformer.changes_made.clear()
+    
     def parse_code(self, code: str) -> Tuple[ast.AST, Optional[Any]]:
         """Parse Python code into AST and CST"""
         try:
@@ -693,6 +724,64 @@ class PythonAdapter:
                 self.logger.log_error(OperationType.TRANSFORMATION, e)
             return code  # Return original code on error
     
+    def apply_renames(self, code: str, renames: List[Tuple[str, str]]) -> Tuple[str, List[bool]]:
+        """Apply (old, new) renames in order with one parse and one tree walk
+        
+        Returns the new code and, per rename, whether applying it on its own
+        at that point would have changed any name.
+        """
+        final_names = _compose_renames(renames)
+        seen = set()
+        
+        try:
+            ast_tree, cst_tree = self.parse_code(code)
+            
+            # Use CST when available for better precision, as apply_rename does
+            if self.cst_transformer and cst_tree:
+                class NameReplacer(cst.CSTTransformer):
+                    def leave_Name(self, original_node, updated_node):
+                        new_name = final_names.get(updated_node.value)
+                        if new_name is None:
+                            return updated_node
+                        seen.add(updated_node.value)
+                        return updated_node.with_changes(value=new_name)
+                
+                refactored_code = cst_tree.visit(NameReplacer()).code
+            else:
+                for old_name, new_name in renames:
+                    self.ast_transformer.rename_variable(old_name, new_name)
+                
+                class RenameTransformer(ast.NodeTransformer):
+                    def visit_Name(self, node):
+                        new_name = final_names.get(node.id)
+                        if new_name is not None:
+                            seen.add(node.id)
+                            node.id = new_name
+                        return node
+                
+                ast_tree = RenameTransformer().visit(ast_tree)
+                
+                if hasattr(ast, 'unparse'):
+                    refactored_code = ast.unparse(ast_tree)
+                else:
+                    refactored_code = astor.to_source(ast_tree)
+            
+            applied = _applied_renames(renames, seen)
+            if self.logger:
+                for (old_name, new_name), was_applied in zip(renames, applied):
+                    if was_applied:
+                        self.logger.log(
+                            LogLevel.INFO, OperationType.TRANSFORMATION,
+                            f"Applied rename: {old_name} -> {new_name}"
+                        )
+            
+            return refactored_code, applied
+        
+        except Exception as e:
+            if self.logger:
+                self.logger.log_error(OperationType.TRANSFORMATION, e)
+            return code, [False] * len(renames)  # Return original code on error
+    
     def add_docstring(self, code: str, target_name: str, docstring: str, target_type: str = None) -> str:
         """Add docstring to a function or class"""
         try:
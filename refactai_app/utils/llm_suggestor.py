@@ -6,14 +6,366 @@ Handles communication with external LLM APIs to get structured refactoring sugge
 Returns JSON-formatted suggestions for naming, documentation, and transformations.
 """
 
+import ast
+import asyncio
+import gzip
 import json
+import logging
 import re
-from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass, asdict
+import time
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
+from dataclasses import dataclass, asdict, fields, MISSING
 from enum import Enum
+from collections import deque
 import requests
+from requests.adapters import HTTPAdapter
 from abc import ABC, abstractmethod
 
+logger = logging.getLogger(__name__)
+
+
+def _create_session(pool_maxsize: int = 20) -> requests.Session:
+    """Create a pooled HTTP session so repeated calls reuse keep-alive connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _is_snake_case_name(name: str) -> bool:
+    """snake_case preferred for Python identifiers"""
+    return name.islower() or '_' in name
+
+
+def _is_camel_case_name(name: str) -> bool:
+    """camelCase preferred for JavaScript/Java identifiers"""
+    return name[0].islower() and '_' not in name
+
+
+# Naming-convention predicate per language, looked up once per rename
+_NAME_VALIDATORS = {
+    'python': _is_snake_case_name,
+    'javascript': _is_camel_case_name,
+    'java': _is_camel_case_name,
+}
+
+# Upper bound on code characters embedded in a single prompt
+MAX_PROMPT_CODE_CHARS = 8000
+
+_EXCESS_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+# Function bodies longer than this are replaced by a placeholder when code is
+# over the prompt budget; if that is not enough, every multi-line body is
+_SUMMARY_BODY_LINES = 12
+
+# Braces outside comments and string literals, plus newlines for line numbers
+_BRACE_TOKEN_RE = re.compile(
+    r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`|[{}]',
+    re.DOTALL
+)
+
+# A line opening a function or method body: a parameter list (or arrow), an
+# optional qualifier such as `const` or `throws X`, then the brace
+_FUNCTION_HEADER_RE = re.compile(r'(?:\)|=>)[^;{}()]*\{\s*$')
+_CONTROL_HEADER_RE = re.compile(
+    r'^\s*(?:\}\s*)?(?:if|else|for|while|switch|catch|do|try|finally|synchronized|with)\b'
+)
+
+# Python lines that cannot end a statement
+_PYTHON_OPEN_LINE_ENDINGS = ('(', '[', '{', ',', '\\', ':')
+
+
+def _leading_whitespace(line: str) -> str:
+    """Indentation at the start of line"""
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _elide_python_bodies(code: str, max_body_lines: int) -> Optional[Tuple[List[str], Set[int]]]:
+    """Replace function bodies longer than max_body_lines, at any depth, with `# ...`
+    
+    Returns the resulting lines and the indexes of lines that end a statement,
+    or None when the code does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    
+    lines = code.split('\n')
+    statement_ends = set()
+    elided = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.stmt):
+            statement_ends.add(node.end_lineno - 1)
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        
+        # Keep the signature and docstring; elide the statements after them
+        first = node.body[0]
+        if ast.get_docstring(node, clean=False) is not None:
+            if len(node.body) == 1 or node.body[1].lineno <= first.end_lineno:
+                continue
+            first = node.body[1]
+        start, end = first.lineno - 1, node.end_lineno - 1
+        if first.lineno == node.lineno or lines[start][:first.col_offset].strip():
+            continue  # Body shares a line with the header
+        if end - start + 1 > max_body_lines:
+            elided[start] = end
+    
+    result, boundaries = [], set()
+    index = 0
+    while index < len(lines):
+        end = elided.get(index)
+        if end is not None:
+            # Nested functions inside the elided body go with it
+            boundaries.add(len(result))
+            result.append(_leading_whitespace(lines[index]) + '# ...')
+            index = end + 1
+            continue
+        if index in statement_ends:
+            boundaries.add(len(result))
+        result.append(lines[index])
+        index += 1
+    return result, boundaries
+
+
+def _brace_pairs(code: str) -> Dict[int, int]:
+    """Line of the matching close brace for each line that opens a brace block"""
+    pairs: Dict[int, int] = {}
+    stack = []
+    line, position = 0, 0
+    for match in _BRACE_TOKEN_RE.finditer(code):
+        token = match.group()
+        if token not in ('{', '}'):
+            continue
+        line += code.count('\n', position, match.start())
+        position = match.start()
+        if token == '{':
+            stack.append(line)
+        elif stack:
+            # A line opening several blocks maps to the one that closes last
+            open_line = stack.pop()
+            pairs[open_line] = max(pairs.get(open_line, line), line)
+    return pairs
+
+
+def _is_function_header(lines: List[str], index: int) -> bool:
+    """Whether the brace ending lines[index] opens a function or method body"""
+    header = lines[index]
+    if header.strip() == '{':
+        # Brace on its own line; the header is the previous non-blank line
+        previous = next((lines[i] for i in range(index - 1, -1, -1) if lines[i].strip()), '')
+        header = previous + ' {'
+    return bool(_FUNCTION_HEADER_RE.search(header)) and not _CONTROL_HEADER_RE.match(header)
+
+
+def _elide_brace_bodies(code: str, max_body_lines: int) -> Tuple[List[str], Set[int]]:
+    """Replace function bodies longer than max_body_lines, at any depth, with `// ...`
+    
+    Returns the resulting lines and the indexes of lines that end a statement
+    or block.
+    """
+    lines = code.split('\n')
+    pairs = _brace_pairs(code)
+    result = []
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        result.append(line)
+        close = pairs.get(index)
+        if (close is not None and close - index - 1 > max_body_lines
+                and line.rstrip().endswith('{') and _is_function_header(lines, index)):
+            body_line = lines[index + 1]
+            indent = _leading_whitespace(body_line) if body_line.strip() else _leading_whitespace(line) + '    '
+            result.append(indent + '// ...')
+            index = close
+            continue
+        index += 1
+    
+    boundaries = {
+        i for i, line in enumerate(result)
+        if line.rstrip().endswith((';', '{', '}')) or line.strip() == '// ...'
+    }
+    return result, boundaries
+
+
+def _summarize_code(code: str, language: str, max_chars: int = MAX_PROMPT_CODE_CHARS) -> str:
+    """Fit code into the prompt budget, eliding long function bodies before cutting anything"""
+    code = _EXCESS_BLANK_LINES_RE.sub('\n\n', code)
+    if len(code) <= max_chars:
+        return code
+    
+    marker = '#' if language == 'python' else '//'
+    lines, boundaries = None, None
+    for max_body_lines in (_SUMMARY_BODY_LINES, 1):
+        if language == 'python':
+            elided = _elide_python_bodies(code, max_body_lines)
+            if elided is None:
+                break
+        else:
+            elided = _elide_brace_bodies(code, max_body_lines)
+        lines, boundaries = elided
+        summary = '\n'.join(lines)
+        if len(summary) <= max_chars:
+            return summary
+    
+    if lines is None:
+        # Python that does not parse: any line that cannot continue a statement
+        lines = code.split('\n')
+        boundaries = {
+            i for i, line in enumerate(lines)
+            if line.strip() and not line.rstrip().endswith(_PYTHON_OPEN_LINE_ENDINGS)
+        }
+    
+    # Still over budget: cut after the last statement, at any depth, that fits
+    cut_line = 0
+    size = 0
+    for index, line in enumerate(lines):
+        size += len(line) + 1
+        if size > max_chars:
+            break
+        if index in boundaries:
+            cut_line = index + 1
+    
+    if cut_line == 0:
+        # No statement boundary fits; cut at the last line break instead
+        text = '\n'.join(lines)
+        cut_line = text.count('\n', 0, max_chars)
+        if cut_line == 0:
+            return text[:max_chars] + f"\n{marker} ... truncated ...\n"
+    
+    omitted = len(lines) - cut_line
+    return '\n'.join(lines[:cut_line]) + f"\n{marker} ... {omitted} more lines omitted ...\n"
+
+
+# System prompt shared by every OpenAI-compatible provider instance
+SYSTEM_PROMPT = """
+You are a code refactoring expert. Analyze the provided code and return structured JSON suggestions for improvements.
+
+Your response MUST be valid JSON with this exact structure:
+{
+  "renames": [
+    {
+      "old_name": "original_name",
+      "new_name": "better_name",
+      "reason": "explanation",
+      "confidence": 0.8,
+      "location": "line 10" (optional)
+    }
+  ],
+  "docstrings": [
+    {
+      "target_type": "function",
+      "target_name": "function_name",
+      "docstring": "Complete docstring text",
+      "style": "google",
+      "location": "line 5" (optional)
+    }
+  ],
+  "transformations": [
+    {
+      "transformation_type": "merge_nested_ifs",
+      "description": "Merge nested if statements for better readability",
+      "location": "lines 15-20",
+      "confidence": 0.9,
+      "safety_level": "safe"
+    }
+  ],
+  "performance": [
+    {
+      "issue_type": "inefficient_loop",
+      "description": "Loop can be optimized",
+      "suggestion": "Use list comprehension instead",
+      "impact": "medium",
+      "location": "line 25"
+    }
+  ],
+  "comments": [
+    {
+      "location": "line 30",
+      "comment": "Explain complex logic here"
+    }
+  ],
+  "metadata": {
+    "analysis_confidence": 0.85,
+    "suggestions_count": 5
+  }
+}
+
+Focus on:
+1. Better variable/function names (clear, descriptive)
+2. Missing or poor docstrings
+3. Safe code transformations (merge conditions, extract functions, etc.)
+4. Performance improvements
+5. Code readability enhancements
+
+Only suggest transformations that are SAFE and maintain code logic.
+"""
+
+# Static instructions for Anthropic, sent as a cached system block ahead of the code
+ANTHROPIC_SYSTEM_PROMPT = """
+You are a code refactoring expert. Analyze the provided code and provide structured JSON suggestions.
+
+Return ONLY valid JSON with this structure:
+{
+  "renames": [
+    {
+      "old_name": "current_name",
+      "new_name": "better_name",
+      "reason": "why this is better",
+      "confidence": 0.8
+    }
+  ],
+  "docstrings": [
+    {
+      "target_type": "function",
+      "target_name": "function_name",
+      "docstring": "Complete docstring",
+      "style": "google"
+    }
+  ],
+  "transformations": [
+    {
+      "transformation_type": "extract_function",
+      "description": "Extract repeated code into function",
+      "location": "lines 10-15",
+      "confidence": 0.9,
+      "safety_level": "safe"
+    }
+  ],
+  "performance": [
+    {
+      "issue_type": "inefficient_operation",
+      "description": "Performance issue description",
+      "suggestion": "How to improve",
+      "impact": "medium"
+    }
+  ],
+  "comments": [],
+  "metadata": {
+    "analysis_confidence": 0.85
+  }
+}
+
+Focus on safe, practical improvements. Only suggest transformations that preserve code logic.
+"""
+
+# Anthropic prompt caching applies to identical leading blocks marked ephemeral
+_ANTHROPIC_SYSTEM_BLOCKS = [
+    {"type": "text", "text": ANTHROPIC_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+]
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+_RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# A 400 answer to a gzip body only means "compression unsupported" when it
+# reports that the body could not be decoded
+_BODY_DECODE_ERROR = re.compile(r'gzip|content.encoding|decompress|decod|json', re.IGNORECASE)
+
+# Transformation safety levels accepted by validate_suggestions
+_SAFE_LEVELS = ('safe', 'moderate')
+
 
 class SuggestionType(Enum):
     """Types of suggestions the LLM can provide"""
@@ -26,7 +378,7 @@ class SuggestionType(Enum):
     BEST_PRACTICE = "best_practice"
 
 
-@dataclass
+@dataclass(slots=True)
 class RenameSuggestion:
     """Suggestion for renaming variables/functions"""
     old_name: str
@@ -36,7 +388,7 @@ class RenameSuggestion:
     location: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DocstringSuggestion:
     """Suggestion for adding/improving docstrings"""
     target_type: str  # 'function', 'class', 'method'
@@ -46,7 +398,7 @@ class DocstringSuggestion:
     location: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class TransformationSuggestion:
     """Suggestion for code transformation"""
     transformation_type: str
@@ -58,7 +410,7 @@ class TransformationSuggestion:
     safety_level: str = "safe"  # 'safe', 'moderate', 'risky'
 
 
-@dataclass
+@dataclass(slots=True)
 class PerformanceSuggestion:
     """Performance improvement suggestion"""
     issue_type: str
@@ -68,7 +420,7 @@ class PerformanceSuggestion:
     location: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMResponse:
     """Structured response from LLM"""
     renames: List[RenameSuggestion]
@@ -77,6 +429,121 @@ class LLMResponse:
     performance: List[PerformanceSuggestion]
     comments: List[Dict[str, str]]
     metadata: Dict[str, Any]
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LLMResponse':
+        """Rebuild a response from its asdict() form through the suggestion schema"""
+        return _response_from_data(data)
+
+
+_FENCED_JSON_RE = re.compile(r'```(?:json)?\s*({.*?})\s*```', re.DOTALL)
+_BARE_JSON_RE = re.compile(r'{.*}', re.DOTALL)
+
+# Field schema per suggestion class: (all field names, required field names)
+_SUGGESTION_SCHEMAS = {
+    cls: (
+        frozenset(f.name for f in fields(cls)),
+        frozenset(f.name for f in fields(cls) if f.default is MISSING and f.default_factory is MISSING)
+    )
+    for cls in (RenameSuggestion, DocstringSuggestion, TransformationSuggestion, PerformanceSuggestion)
+}
+
+
+def _build_suggestions(cls, items: List[Any]) -> List[Any]:
+    """Build suggestion objects, ignoring unknown keys and dropping incomplete items"""
+    known, required = _SUGGESTION_SCHEMAS[cls]
+    suggestions = []
+    for item in items:
+        if not isinstance(item, dict) or not required.issubset(item):
+            continue
+        suggestions.append(cls(**{k: v for k, v in item.items() if k in known}))
+    return suggestions
+
+
+def _load_json_payload(content: str) -> Any:
+    """Decode the JSON object in an LLM reply, with or without a markdown code fence"""
+    json_match = _FENCED_JSON_RE.search(content)
+    if json_match:
+        return json.loads(json_match.group(1))
+    
+    # Try to find JSON without code blocks
+    json_match = _BARE_JSON_RE.search(content)
+    if json_match:
+        return json.loads(json_match.group(0))
+    
+    raise ValueError("No JSON found in response")
+
+
+def _response_from_data(data: Dict[str, Any]) -> LLMResponse:
+    """Convert decoded suggestion JSON into structured objects"""
+    return LLMResponse(
+        renames=_build_suggestions(RenameSuggestion, data.get('renames', [])),
+        docstrings=_build_suggestions(DocstringSuggestion, data.get('docstrings', [])),
+        transformations=_build_suggestions(TransformationSuggestion, data.get('transformations', [])),
+        performance=_build_suggestions(PerformanceSuggestion, data.get('performance', [])),
+        comments=data.get('comments', []),
+        metadata=data.get('metadata', {})
+    )
+
+
+# Output tokens requested per file in a batched prompt, and the overall cap
+BATCH_TOKENS_PER_FILE = 2000
+MAX_BATCH_RESPONSE_TOKENS = 8000
+
+
+def _summarize_context(context: Dict[str, Any]) -> str:
+    """Render the git history, naming conventions and file type lines of a prompt"""
+    parts = []
+    
+    if context.get('git_context'):
+        git_info = context['git_context']
+        recent_messages = [c.get('message', '') for c in git_info.get('recent_changes', [])[:3]]
+        parts.append(f"""
+- File has {len(git_info.get('file_history', []))} recent commits
+- Recent changes: {', '.join(recent_messages)}
+""")
+    
+    if context.get('naming_patterns'):
+        patterns = context['naming_patterns']
+        parts.append(f"""
+- Naming conventions in codebase: {', '.join([p.description for p in patterns[:2]])}
+""")
+    
+    if context.get('file_type'):
+        parts.append(f"""
+- File type: {context['file_type']}
+""")
+    
+    return ''.join(parts)
+
+
+def _create_batch_prompt(items: List[Dict[str, Any]]) -> str:
+    """Create one prompt covering several files, answered as JSON keyed by file_id"""
+    parts = ["""
+Analyze each of the following files and provide refactoring suggestions for every one.
+
+Return ONLY one JSON object whose keys are the file ids below. The value for each
+key must follow the JSON structure specified for a single file (renames, docstrings,
+transformations, performance, comments, metadata).
+"""]
+    
+    for item in items:
+        language = item['language']
+        code = _summarize_code(item['code'], language)
+        parts.append(f"""
+File id: {item['file_id']}
+Context information:
+{_summarize_context(item.get('context') or {})}
+```{language}
+{code}
+```
+""")
+    
+    parts.append("""
+Focus on practical, safe improvements that maintain code functionality.
+""")
+    
+    return ''.join(parts)
 
 
 class LLMProvider(ABC):
@@ -91,11 +558,93 @@ class LLMProvider(ABC):
     def is_available(self) -> bool:
         """Check if the LLM provider is available"""
         pass
+    
+    async def generate_suggestions_async(self, code: str, language: str, context: Dict[str, Any]) -> LLMResponse:
+        """Generate suggestions without blocking the event loop"""
+        return await asyncio.to_thread(self.generate_suggestions, code, language, context)
+    
+    def generate_suggestions_batch(self, items: List[Dict[str, Any]]) -> Dict[str, LLMResponse]:
+        """Generate suggestions for several files, keyed by each item's file_id"""
+        # Providers without a batched prompt fall back to one request per file
+        return {
+            item['file_id']: self.generate_suggestions(item['code'], item['language'], item.get('context', {}))
+            for item in items
+        }
+    
+    # Gzip request bodies above compress_min_bytes when the endpoint accepts it
+    compress_requests = False
+    compress_min_bytes = 1024
+    _compression_confirmed = False
+    
+    # Retry transient failures (rate limits, server errors) with exponential backoff
+    max_attempts = 3
+    backoff_base = 0.5
+    backoff_max = 8.0
+    
+    def _post_json(self, url: str, payload: Dict[str, Any], headers: Dict[str, str], timeout: float) -> requests.Response:
+        """POST a JSON payload, retrying transient failures with exponential backoff"""
+        body = json.dumps(payload).encode('utf-8')
+        
+        for attempt in range(self.max_attempts):
+            last_attempt = attempt == self.max_attempts - 1
+            try:
+                response = self._send_json_body(url, body, headers, timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                time.sleep(self._backoff_delay(attempt))
+                continue
+            
+            if response.status_code not in _RETRYABLE_STATUS_CODES or last_attempt:
+                return response
+            
+            logger.info("%s returned %s, retrying", type(self).__name__, response.status_code)
+            time.sleep(self._backoff_delay(attempt, response.headers.get('Retry-After')))
+        
+        return response
+    
+    def _send_json_body(self, url: str, body: bytes, headers: Dict[str, str], timeout: float) -> requests.Response:
+        """Send an encoded JSON body, gzip-compressing large bodies when enabled"""
+        if self.compress_requests and len(body) > self.compress_min_bytes:
+            response = self.session.post(
+                url,
+                data=gzip.compress(body, compresslevel=1),
+                headers={**headers, "Content-Encoding": "gzip"},
+                timeout=timeout
+            )
+            if response.status_code < 400:
+                self._compression_confirmed = True
+            if self._compression_confirmed or not self._rejects_compression(response):
+                return response
+            # Endpoint rejected the compressed body; send plain JSON from now on
+            logger.info("Disabling request compression for %s", type(self).__name__)
+            self.compress_requests = False
+        
+        return self.session.post(url, data=body, headers=headers, timeout=timeout)
+    
+    @staticmethod
+    def _rejects_compression(response: requests.Response) -> bool:
+        """Whether an error response means the endpoint cannot decode gzip bodies"""
+        if response.status_code == 415:
+            return True
+        return response.status_code == 400 and bool(_BODY_DECODE_ERROR.search(response.text or ''))
+    
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before the next attempt, honouring Retry-After when given"""
+        delay = self.backoff_base * (2 ** attempt)
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                pass
+        return min(delay, self.backoff_max)
 
 
 class OpenAIProvider(LLMProvider):
     """OpenAI GPT provider for refactoring suggestions"""
     
+    compress_requests = True
+    
     def __init__(self, api_key: str, model: str = "gpt-4", base_url: str = None):
         self.api_key = api_key
         self.model = model
@@ -104,11 +653,12 @@ class OpenAIProvider(LLMProvider):
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        self.session = _create_session()
     
     def is_available(self) -> bool:
         """Check if OpenAI API is available"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/models",
                 headers=self.headers,
                 timeout=5
@@ -122,10 +672,9 @@ class OpenAIProvider(LLMProvider):
         prompt = self._create_refactoring_prompt(code, language, context)
         
         try:
-            response = requests.post(
+            response = self._post_json(
                 f"{self.base_url}/chat/completions",
-                headers=self.headers,
-                json={
+                {
                     "model": self.model,
                     "messages": [
                         {"role": "system", "content": self._get_system_prompt()},
@@ -134,6 +683,7 @@ class OpenAIProvider(LLMProvider):
                     "temperature": 0.3,
                     "max_tokens": 2000
                 },
+                headers=self.headers,
                 timeout=30
             )
             
@@ -142,155 +692,100 @@ class OpenAIProvider(LLMProvider):
                 content = result['choices'][0]['message']['content']
                 return self._parse_llm_response(content)
             else:
-                print(f"OpenAI API error: {response.status_code}")
+                logger.warning("OpenAI API error: %s", response.status_code)
                 return self._empty_response()
                 
         except Exception as e:
-            print(f"Error calling OpenAI API: {e}")
+            logger.error("Error calling OpenAI API: %s", e)
             return self._empty_response()
     
+    def generate_suggestions_batch(self, items: List[Dict[str, Any]]) -> Dict[str, LLMResponse]:
+        """Generate suggestions for several files with a single chat completion"""
+        file_ids = [item['file_id'] for item in items]
+        
+        try:
+            response = self._post_json(
+                f"{self.base_url}/chat/completions",
+                {
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": self._get_system_prompt()},
+                        {"role": "user", "content": _create_batch_prompt(items)}
+                    ],
+                    "temperature": 0.3,
+                    "max_tokens": min(BATCH_TOKENS_PER_FILE * len(items), MAX_BATCH_RESPONSE_TOKENS)
+                },
+                headers=self.headers,
+                timeout=30 * len(items)
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                content = result['choices'][0]['message']['content']
+                return self._parse_batch_response(content, file_ids)
+            else:
+                logger.warning("OpenAI API error: %s", response.status_code)
+                
+        except Exception as e:
+            logger.error("Error calling OpenAI API: %s", e)
+        
+        return {file_id: self._empty_response() for file_id in file_ids}
+    
     def _get_system_prompt(self) -> str:
         """Get the system prompt for refactoring"""
-        return """
-You are a code refactoring expert. Analyze the provided code and return structured JSON suggestions for improvements.
-
-Your response MUST be valid JSON with this exact structure:
-{
-  "renames": [
-    {
-      "old_name": "original_name",
-      "new_name": "better_name",
-      "reason": "explanation",
-      "confidence": 0.8,
-      "location": "line 10" (optional)
-    }
-  ],
-  "docstrings": [
-    {
-      "target_type": "function",
-      "target_name": "function_name",
-      "docstring": "Complete docstring text",
-      "style": "google",
-      "location": "line 5" (optional)
-    }
-  ],
-  "transformations": [
-    {
-      "transformation_type": "merge_nested_ifs",
-      "description": "Merge nested if statements for better readability",
-      "location": "lines 15-20",
-      "confidence": 0.9,
-      "safety_level": "safe"
-    }
-  ],
-  "performance": [
-    {
-      "issue_type": "inefficient_loop",
-      "description": "Loop can be optimized",
-      "suggestion": "Use list comprehension instead",
-      "impact": "medium",
-      "location": "line 25"
-    }
-  ],
-  "comments": [
-    {
-      "location": "line 30",
-      "comment": "Explain complex logic here"
-    }
-  ],
-  "metadata": {
-    "analysis_confidence": 0.85,
-    "suggestions_count": 5
-  }
-}
-
-Focus on:
-1. Better variable/function names (clear, descriptive)
-2. Missing or poor docstrings
-3. Safe code transformations (merge conditions, extract functions, etc.)
-4. Performance improvements
-5. Code readability enhancements
-
-Only suggest transformations that are SAFE and maintain code logic.
-"""
+        return SYSTEM_PROMPT
     
     def _create_refactoring_prompt(self, code: str, language: str, context: Dict[str, Any]) -> str:
         """Create a detailed prompt for refactoring suggestions"""
-        prompt = f"""
-Analyze this {language} code and provide refactoring suggestions:
+        code = _summarize_code(code, language)
+        # Stable text first and the code last, so providers can reuse the cached prompt prefix
+        parts = [f"""
+Analyze this {language} code and provide refactoring suggestions.
+Provide suggestions following the JSON structure specified in the system prompt.
+Focus on practical, safe improvements that maintain code functionality.
 
+Context information:
+"""]
+        
+        parts.append(_summarize_context(context))
+        parts.append(f"""
+Code to analyze:
 ```{language}
 {code}
 ```
-
-Context information:
-"""
-        
-        if context.get('git_context'):
-            git_info = context['git_context']
-            prompt += f"""
-- File has {len(git_info.get('file_history', []))} recent commits
-- Recent changes: {', '.join([c.get('message', '') for c in git_info.get('recent_changes', [])][:3])}
-"""
-        
-        if context.get('naming_patterns'):
-            patterns = context['naming_patterns']
-            prompt += f"""
-- Naming conventions in codebase: {', '.join([p.description for p in patterns[:2]])}
-"""
+""")
         
-        if context.get('file_type'):
-            prompt += f"""
-- File type: {context['file_type']}
-"""
-        
-        prompt += """
-
-Provide suggestions following the JSON structure specified in the system prompt.
-Focus on practical, safe improvements that maintain code functionality.
-"""
-        
-        return prompt
+        return ''.join(parts)
     
     def _parse_llm_response(self, content: str) -> LLMResponse:
         """Parse LLM response into structured format"""
         try:
             # Extract JSON from response (handle markdown code blocks)
-            json_match = re.search(r'```(?:json)?\s*({.*?})\s*```', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # Try to find JSON without code blocks
-                json_match = re.search(r'{.*}', content, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-                else:
-                    raise ValueError("No JSON found in response")
-            
-            data = json.loads(json_str)
-            
-            # Convert to structured objects
-            renames = [RenameSuggestion(**item) for item in data.get('renames', [])]
-            docstrings = [DocstringSuggestion(**item) for item in data.get('docstrings', [])]
-            transformations = [TransformationSuggestion(**item) for item in data.get('transformations', [])]
-            performance = [PerformanceSuggestion(**item) for item in data.get('performance', [])]
-            comments = data.get('comments', [])
-            metadata = data.get('metadata', {})
-            
-            return LLMResponse(
-                renames=renames,
-                docstrings=docstrings,
-                transformations=transformations,
-                performance=performance,
-                comments=comments,
-                metadata=metadata
-            )
+            return _response_from_data(_load_json_payload(content))
             
         except Exception as e:
-            print(f"Error parsing LLM response: {e}")
-            print(f"Response content: {content[:500]}...")
+            logger.warning("Error parsing LLM response: %s", e)
+            logger.debug("Response content: %.500s...", content)
             return self._empty_response()
     
+    def _parse_batch_response(self, content: str, file_ids: List[str]) -> Dict[str, LLMResponse]:
+        """Split a batched reply into one structured response per file_id"""
+        try:
+            data = _load_json_payload(content)
+        except Exception as e:
+            logger.warning("Error parsing batched LLM response: %s", e)
+            data = {}
+        
+        responses = {}
+        for file_id in file_ids:
+            file_data = data.get(file_id) if isinstance(data, dict) else None
+            try:
+                responses[file_id] = _response_from_data(file_data) if isinstance(file_data, dict) else self._empty_response()
+            except Exception as e:
+                logger.warning("Error parsing suggestions for %s: %s", file_id, e)
+                responses[file_id] = self._empty_response()
+        return responses
+    
     def _empty_response(self) -> LLMResponse:
         """Return empty response structure"""
         return LLMResponse(
@@ -306,6 +801,8 @@ Focus on practical, safe improvements that maintain code functionality.
 class AnthropicProvider(LLMProvider):
     """Anthropic Claude provider for refactoring suggestions"""
     
+    compress_requests = True
+    
     def __init__(self, api_key: str, model: str = "claude-3-sonnet-20240229"):
         self.api_key = api_key
         self.model = model
@@ -314,11 +811,12 @@ class AnthropicProvider(LLMProvider):
             "Content-Type": "application/json",
             "anthropic-version": "2023-06-01"
         }
+        self.session = _create_session()
     
     def is_available(self) -> bool:
         """Check if Anthropic API is available"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 "https://api.anthropic.com/v1/messages",
                 headers=self.headers,
                 json={
@@ -337,16 +835,17 @@ class AnthropicProvider(LLMProvider):
         prompt = self._create_refactoring_prompt(code, language, context)
         
         try:
-            response = requests.post(
+            response = self._post_json(
                 "https://api.anthropic.com/v1/messages",
-                headers=self.headers,
-                json={
+                {
                     "model": self.model,
                     "max_tokens": 2000,
+                    "system": _ANTHROPIC_SYSTEM_BLOCKS,
                     "messages": [
                         {"role": "user", "content": prompt}
                     ]
                 },
+                headers=self.headers,
                 timeout=30
             )
             
@@ -355,71 +854,63 @@ class AnthropicProvider(LLMProvider):
                 content = result['content'][0]['text']
                 return self._parse_llm_response(content)
             else:
-                print(f"Anthropic API error: {response.status_code}")
+                logger.warning("Anthropic API error: %s", response.status_code)
                 return self._empty_response()
                 
         except Exception as e:
-            print(f"Error calling Anthropic API: {e}")
+            logger.error("Error calling Anthropic API: %s", e)
             return self._empty_response()
     
+    def generate_suggestions_batch(self, items: List[Dict[str, Any]]) -> Dict[str, LLMResponse]:
+        """Generate suggestions for several files with a single message"""
+        file_ids = [item['file_id'] for item in items]
+        
+        try:
+            response = self._post_json(
+                "https://api.anthropic.com/v1/messages",
+                {
+                    "model": self.model,
+                    "max_tokens": min(BATCH_TOKENS_PER_FILE * len(items), MAX_BATCH_RESPONSE_TOKENS),
+                    "system": _ANTHROPIC_SYSTEM_BLOCKS,
+                    "messages": [
+                        {"role": "user", "content": _create_batch_prompt(items)}
+                    ]
+                },
+                headers=self.headers,
+                timeout=30 * len(items)
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                content = result['content'][0]['text']
+                return self._parse_batch_response(content, file_ids)
+            else:
+                logger.warning("Anthropic API error: %s", response.status_code)
+                
+        except Exception as e:
+            logger.error("Error calling Anthropic API: %s", e)
+        
+        return {file_id: self._empty_response() for file_id in file_ids}
+    
     def _create_refactoring_prompt(self, code: str, language: str, context: Dict[str, Any]) -> str:
-        """Create prompt for Anthropic Claude"""
+        """Create the per-file part of the prompt for Anthropic Claude"""
+        code = _summarize_code(code, language)
+        # Instructions live in the cached system block; only the code varies
         return f"""
-You are a code refactoring expert. Analyze this {language} code and provide structured JSON suggestions.
-
-Code to analyze:
+Analyze this {language} code:
 ```{language}
 {code}
 ```
-
-Return ONLY valid JSON with this structure:
-{{
-  "renames": [
-    {{
-      "old_name": "current_name",
-      "new_name": "better_name",
-      "reason": "why this is better",
-      "confidence": 0.8
-    }}
-  ],
-  "docstrings": [
-    {{
-      "target_type": "function",
-      "target_name": "function_name",
-      "docstring": "Complete docstring",
-      "style": "google"
-    }}
-  ],
-  "transformations": [
-    {{
-      "transformation_type": "extract_function",
-      "description": "Extract repeated code into function",
-      "location": "lines 10-15",
-      "confidence": 0.9,
-      "safety_level": "safe"
-    }}
-  ],
-  "performance": [
-    {{
-      "issue_type": "inefficient_operation",
-      "description": "Performance issue description",
-      "suggestion": "How to improve",
-      "impact": "medium"
-    }}
-  ],
-  "comments": [],
-  "metadata": {{
-    "analysis_confidence": 0.85
-  }}
-}}
-
-Focus on safe, practical improvements. Only suggest transformations that preserve code logic.
 """
     
     def _parse_llm_response(self, content: str) -> LLMResponse:
         """Parse Anthropic response (reuse OpenAI parser)"""
         return OpenAIProvider._parse_llm_response(self, content)
     
+    def _parse_batch_response(self, content: str, file_ids: List[str]) -> Dict[str, LLMResponse]:
+        """Parse a batched Anthropic response (reuse OpenAI parser)"""
+        return OpenAIProvider._parse_batch_response(self, content, file_ids)
+    
     def _empty_response(self) -> LLMResponse:
         """Return empty response structure"""
         return OpenAIProvider._empty_response(self)
@@ -431,11 +922,12 @@ class LocalLLMProvider(LLMProvider):
     def __init__(self, base_url: str, model: str = "codellama"):
         self.base_url = base_url.rstrip('/')
         self.model = model
+        self.session = _create_session()
     
     def is_available(self) -> bool:
         """Check if local LLM is available"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             return response.status_code == 200
         except Exception:
             return False
@@ -445,7 +937,7 @@ class LocalLLMProvider(LLMProvider):
         prompt = self._create_simple_prompt(code, language)
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/generate",
                 json={
                     "model": self.model,
@@ -467,11 +959,12 @@ class LocalLLMProvider(LLMProvider):
                 return self._empty_response()
                 
         except Exception as e:
-            print(f"Error calling local LLM: {e}")
+            logger.error("Error calling local LLM: %s", e)
             return self._empty_response()
     
     def _create_simple_prompt(self, code: str, language: str) -> str:
         """Create simplified prompt for local LLM"""
+        code = _summarize_code(code, language)
         return f"""
 Analyze this {language} code and suggest improvements:
 
@@ -516,7 +1009,7 @@ Format as JSON with 'renames', 'docstrings', and 'transformations' arrays.
                 return self._empty_response()
                 
         except Exception as e:
-            print(f"Error parsing local LLM response: {e}")
+            logger.warning("Error parsing local LLM response: %s", e)
             return self._empty_response()
     
     def _empty_response(self) -> LLMResponse:
@@ -534,9 +1027,19 @@ Format as JSON with 'renames', 'docstrings', and 'transformations' arrays.
 class LLMSuggestor:
     """Main class for managing LLM suggestions"""
     
-    def __init__(self):
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0, window_size: int = 20):
         self.providers: List[LLMProvider] = []
         self.fallback_enabled = True
+        
+        # Circuit breaker: skip a provider for reset_timeout seconds after
+        # failure_threshold consecutive failures, or when more than half of
+        # its recent calls (rolling window of window_size) have failed
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.window_size = window_size
+        self._failure_counts: Dict[LLMProvider, int] = {}
+        self._outcomes: Dict[LLMProvider, deque] = {}
+        self._opened_at: Dict[LLMProvider, float] = {}
     
     def add_provider(self, provider: LLMProvider):
         """Add an LLM provider"""
@@ -547,16 +1050,112 @@ class LLMSuggestor:
         context = context or {}
         
         for provider in self.providers:
-            if provider.is_available():
-                try:
-                    response = provider.generate_suggestions(code, language, context)
-                    if response and (response.renames or response.docstrings or response.transformations):
-                        return response
-                except Exception as e:
-                    print(f"Provider {type(provider).__name__} failed: {e}")
-                    continue
+            if self._is_circuit_open(provider):
+                continue
+            try:
+                response = provider.generate_suggestions(code, language, context)
+            except Exception as e:
+                logger.warning("Provider %s failed: %s", type(provider).__name__, e)
+                self._record_result(provider, None)
+                continue
+            
+            self._record_result(provider, response)
+            if response and (response.renames or response.docstrings or response.transformations):
+                return response
         
         # Return empty response if all providers fail
+        return self._no_providers_response()
+    
+    async def get_suggestions_async(self, code: str, language: str, context: Dict[str, Any] = None) -> LLMResponse:
+        """Async get_suggestions: providers are tried in order until one has suggestions"""
+        context = context or {}
+        
+        for provider in self.providers:
+            if self._is_circuit_open(provider):
+                continue
+            try:
+                response = await provider.generate_suggestions_async(code, language, context)
+            except Exception as e:
+                logger.warning("Provider %s failed: %s", type(provider).__name__, e)
+                self._record_result(provider, None)
+                continue
+            
+            self._record_result(provider, response)
+            if response and (response.renames or response.docstrings or response.transformations):
+                return response
+        
+        return self._no_providers_response()
+    
+    def get_suggestions_batch(self, items: List[Dict[str, Any]]) -> Dict[str, LLMResponse]:
+        """Get suggestions for several files at once, keyed by each item's file_id"""
+        results: Dict[str, LLMResponse] = {}
+        pending = list(items)
+        
+        for provider in self.providers:
+            if not pending:
+                break
+            if self._is_circuit_open(provider):
+                continue
+            try:
+                responses = provider.generate_suggestions_batch(pending)
+            except Exception as e:
+                logger.warning("Provider %s failed: %s", type(provider).__name__, e)
+                self._record_result(provider, None)
+                continue
+            
+            # One circuit-breaker outcome per request: it succeeded if any file got a usable reply
+            usable = next((r for r in responses.values() if r and 'error' not in r.metadata), None)
+            self._record_result(provider, usable)
+            
+            # Files this provider had nothing for are retried with the next one
+            remaining = []
+            for item in pending:
+                response = responses.get(item['file_id'])
+                if response and (response.renames or response.docstrings or response.transformations):
+                    results[item['file_id']] = response
+                else:
+                    remaining.append(item)
+            pending = remaining
+        
+        for item in pending:
+            results[item['file_id']] = self._no_providers_response()
+        return results
+    
+    def _is_circuit_open(self, provider: LLMProvider) -> bool:
+        """Check whether a provider is temporarily skipped after repeated failures"""
+        opened_at = self._opened_at.get(provider)
+        if opened_at is None:
+            return False
+        if time.monotonic() - opened_at >= self.reset_timeout:
+            # Half-open: allow one trial call, a single failure re-opens the circuit
+            del self._opened_at[provider]
+            self._failure_counts[provider] = self.failure_threshold - 1
+            return False
+        return True
+    
+    def _record_result(self, provider: LLMProvider, response: Optional[LLMResponse]):
+        """Update circuit breaker state from a provider call outcome"""
+        success = response is not None and 'error' not in response.metadata
+        outcomes = self._outcomes.get(provider)
+        if outcomes is None:
+            outcomes = self._outcomes[provider] = deque(maxlen=self.window_size)
+        outcomes.append(success)
+        
+        if success:
+            self._failure_counts[provider] = 0
+            return
+        
+        failures = self._failure_counts.get(provider, 0) + 1
+        self._failure_counts[provider] = failures
+        
+        failure_rate = outcomes.count(False) / len(outcomes)
+        rate_tripped = len(outcomes) >= self.window_size // 2 and failure_rate > 0.5
+        if failures >= self.failure_threshold or rate_tripped:
+            self._opened_at[provider] = time.monotonic()
+            outcomes.clear()
+    
+    def _no_providers_response(self) -> LLMResponse:
+        """Return empty response used when every provider fails"""
         return LLMResponse(
             renames=[],
             docstrings=[],
@@ -571,13 +1170,15 @@ class LLMSuggestor:
         # Filter transformations by safety level
         safe_transformations = [
             t for t in suggestions.transformations 
-            if t.safety_level in ['safe', 'moderate'] and t.confidence > 0.6
+            if t.confidence > 0.6 and t.safety_level in _SAFE_LEVELS
         ]
         
-        # Filter renames with high confidence
+        # Filter renames with high confidence (cheap check first so name
+        # validation only runs for confident suggestions)
+        is_valid_name = self._is_valid_name
         safe_renames = [
             r for r in suggestions.renames 
-            if r.confidence > 0.7 and self._is_valid_name(r.new_name, language)
+            if r.confidence > 0.7 and is_valid_name(r.new_name, language)
         ]
         
         return LLMResponse(
@@ -591,13 +1192,9 @@ class LLMSuggestor:
     
     def _is_valid_name(self, name: str, language: str) -> bool:
         """Check if a name is valid for the given language"""
-        if not name or not name.replace('_', '').replace('-', '').isalnum():
+        if not name or not name.isidentifier():
             return False
         
         # Language-specific validation
-        if language == 'python':
-            return name.islower() or '_' in name  # snake_case preferred
-        elif language in ['javascript', 'java']:
-            return name[0].islower() and '_' not in name  # camelCase preferred
-        
-        return True
\ No newline at end of file
+        validator = _NAME_VALIDATORS.get(language)
+        return validator(name) if validator else True
\ No newline at end of file
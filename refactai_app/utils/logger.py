@@ -10,13 +10,78 @@ import os
 import json
 import time
 import logging
+import logging.handlers
+import queue
+import atexit
 import difflib
-from typing import Dict, List, Any, Optional, Union
+import itertools
+from typing import Deque, Dict, Iterable, List, Any, Optional, Tuple, Union
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, asdict, fields
 from datetime import datetime
+from functools import cached_property, lru_cache
 from enum import Enum
 import hashlib
+import heapq
+from array import array
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+# Characters encoded per hasher update, so large sources are never
+# duplicated in memory as one UTF-8 buffer
+_HASH_CHUNK_CHARS = 1 << 16
+
+
+def _fingerprint(text: str) -> str:
+    """Content fingerprint of a source string (not used for security)"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for start in range(0, len(text), _HASH_CHUNK_CHARS):
+        hasher.update(text[start:start + _HASH_CHUNK_CHARS].encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str, separators=(',', ':')).encode('utf-8')
+
+
+# Write buffer for exported log files
+_EXPORT_BUFFER_SIZE = 1 << 20
+
+# Separators used in the unified diff text export
+_SECTION_SEPARATOR = b"\n" + b"=" * 80 + b"\n\n"
+_DIFF_HEADER_RULE = b"-" * 40 + b"\n"
+
+
+@lru_cache(maxsize=4096)
+def _isoformat_seconds(seconds: int) -> str:
+    """ISO-8601 local time for a whole-second epoch timestamp"""
+    return datetime.fromtimestamp(seconds).isoformat()
+
+
+def _isoformat(timestamp: float) -> str:
+    """Equivalent of datetime.fromtimestamp(timestamp).isoformat()"""
+    # Entries logged within the same second share the cached date/time
+    # part; only the microsecond suffix is formatted per call
+    seconds = int(timestamp // 1)
+    micros = round((timestamp - seconds) * 1e6)
+    if micros >= 1000000:
+        seconds += 1
+        micros = 0
+    if micros:
+        return f"{_isoformat_seconds(seconds)}.{micros:06d}"
+    return _isoformat_seconds(seconds)
 
 
 class LogLevel(Enum):
@@ -40,7 +105,21 @@ class OperationType(Enum):
     LLM_REQUEST = "llm_request"
 
 
-@dataclass
+# Python logging level number for each LogLevel
+_LEVEL_NUMBERS = {
+    LogLevel.DEBUG: logging.DEBUG,
+    LogLevel.INFO: logging.INFO,
+    LogLevel.WARNING: logging.WARNING,
+    LogLevel.ERROR: logging.ERROR,
+    LogLevel.CRITICAL: logging.CRITICAL,
+}
+
+# Enum value strings, looked up with a plain dict instead of Enum.value
+_LEVEL_VALUES = {level: level.value for level in LogLevel}
+_OPERATION_VALUES = {op: op.value for op in OperationType}
+
+
+@dataclass(slots=True)
 class LogEntry:
     """Single log entry"""
     timestamp: float
@@ -56,9 +135,9 @@ class LogEntry:
         """Convert to dictionary"""
         return {
             'timestamp': self.timestamp,
-            'datetime': datetime.fromtimestamp(self.timestamp).isoformat(),
-            'level': self.level.value,
-            'operation_type': self.operation_type.value,
+            'datetime': _isoformat(self.timestamp),
+            'level': _LEVEL_VALUES[self.level],
+            'operation_type': _OPERATION_VALUES[self.operation_type],
             'message': self.message,
             'file_path': self.file_path,
             'line_number': self.line_number,
@@ -79,25 +158,57 @@ class DiffEntry:
     changes_summary: Dict[str, Any]
     
     def __post_init__(self):
-        """Calculate diff statistics"""
-        self.original_lines = self.original_code.split('\n')
-        self.refactored_lines = self.refactored_code.split('\n')
-        self.lines_added = len(self.refactored_lines) - len(self.original_lines)
-        self.lines_changed = self._count_changed_lines()
-        self.similarity_ratio = difflib.SequenceMatcher(
-            None, self.original_code, self.refactored_code
-        ).ratio()
+        """Split sources into lines; diff statistics are computed on demand"""
+        self.original_lines = self.original_code.splitlines()
+        self.refactored_lines = self.refactored_code.splitlines()
+    
+    @cached_property
+    def lines_added(self) -> int:
+        """Net change in line count"""
+        return len(self.refactored_lines) - len(self.original_lines)
+    
+    @cached_property
+    def lines_changed(self) -> int:
+        """Number of added or removed lines"""
+        if self.original_code == self.refactored_code:
+            return 0
+        return self._count_changed_lines()
+    
+    @cached_property
+    def similarity_ratio(self) -> float:
+        """Line-based similarity between original and refactored code"""
+        # Unchanged code is common; skip the matcher entirely
+        if self.original_code == self.refactored_code:
+            return 1.0
+        return self._matcher.ratio()
+    
+    @cached_property
+    def original_hash(self) -> str:
+        """Fingerprint of the original code"""
+        return _fingerprint(self.original_code)
+    
+    @cached_property
+    def refactored_hash(self) -> str:
+        """Fingerprint of the refactored code"""
+        # Unchanged code (the common case) shares the original's fingerprint
+        if self.refactored_code == self.original_code:
+            return self.original_hash
+        return _fingerprint(self.refactored_code)
+    
+    @cached_property
+    def _matcher(self) -> difflib.SequenceMatcher:
+        """Line matcher shared by the statistics, built on first use"""
+        # Comparing line sequences rather than characters keeps the
+        # quadratic matcher cheap on large files
+        return difflib.SequenceMatcher(None, self.original_lines, self.refactored_lines)
     
     def _count_changed_lines(self) -> int:
         """Count number of changed lines"""
-        differ = difflib.unified_diff(
-            self.original_lines, self.refactored_lines, lineterm=''
-        )
+        # Same count a unified diff reports as '+'/'-' lines
         changes = 0
-        for line in differ:
-            if line.startswith('+') or line.startswith('-'):
-                if not line.startswith('+++') and not line.startswith('---'):
-                    changes += 1
+        for tag, i1, i2, j1, j2 in self._matcher.get_opcodes():
+            if tag != 'equal':
+                changes += (i2 - i1) + (j2 - j1)
         return changes
     
     def get_unified_diff(self, context_lines: int = 3) -> str:
@@ -113,6 +224,11 @@ class DiffEntry:
     
     def get_html_diff(self) -> str:
         """Get HTML diff format"""
+        return self.html_diff
+    
+    @cached_property
+    def html_diff(self) -> str:
+        """HTML side-by-side diff, rendered on first access only"""
         differ = difflib.HtmlDiff()
         return differ.make_file(
             self.original_lines,
@@ -127,7 +243,7 @@ class DiffEntry:
             'file_path': self.file_path,
             'language': self.language,
             'timestamp': self.timestamp,
-            'datetime': datetime.fromtimestamp(self.timestamp).isoformat(),
+            'datetime': _isoformat(self.timestamp),
             'operation_id': self.operation_id,
             'changes_summary': self.changes_summary,
             'statistics': {
@@ -137,12 +253,25 @@ class DiffEntry:
                 'lines_changed': self.lines_changed,
                 'similarity_ratio': self.similarity_ratio
             },
-            'original_hash': hashlib.md5(self.original_code.encode()).hexdigest(),
-            'refactored_hash': hashlib.md5(self.refactored_code.encode()).hexdigest()
+            'original_hash': self.original_hash,
+            'refactored_hash': self.refactored_hash
         }
 
 
-@dataclass
+# DiffEntry fields written to the spill file; statistics are derived on export
+_DIFF_FIELDS = tuple(f.name for f in fields(DiffEntry))
+
+# Minimum number of pending diffs worth fanning out to worker processes
+_PARALLEL_DIFF_THRESHOLD = 8
+
+
+def _compute_diff_stats(original_code: str, refactored_code: str) -> Tuple[int, float]:
+    """Compute (lines_changed, similarity_ratio) for a diff in a worker process"""
+    entry = DiffEntry('', original_code, refactored_code, '', 0.0, '', {})
+    return entry.lines_changed, entry.similarity_ratio
+
+
+@dataclass(slots=True)
 class PerformanceMetrics:
     """Performance metrics for operations"""
     operation_id: str
@@ -160,12 +289,12 @@ class PerformanceMetrics:
         """Convert to dictionary"""
         return {
             'operation_id': self.operation_id,
-            'operation_type': self.operation_type.value,
+            'operation_type': _OPERATION_VALUES[self.operation_type],
             'start_time': self.start_time,
             'end_time': self.end_time,
             'duration': self.duration,
-            'start_datetime': datetime.fromtimestamp(self.start_time).isoformat(),
-            'end_datetime': datetime.fromtimestamp(self.end_time).isoformat(),
+            'start_datetime': _isoformat(self.start_time),
+            'end_datetime': _isoformat(self.end_time),
             'file_path': self.file_path,
             'file_size': self.file_size,
             'line_count': self.line_count,
@@ -174,6 +303,92 @@ class PerformanceMetrics:
         }
 
 
+# Enum members by their position, for compact per-row storage
+_LEVELS = tuple(LogLevel)
+_LEVEL_INDEX = {level: index for index, level in enumerate(_LEVELS)}
+_OPERATIONS = tuple(OperationType)
+_OPERATION_INDEX = {op: index for index, op in enumerate(_OPERATIONS)}
+_LEVEL_VALUE_BY_INDEX = tuple(level.value for level in _LEVELS)
+_OPERATION_VALUE_BY_INDEX = tuple(op.value for op in _OPERATIONS)
+
+
+class LogColumns:
+    """Log entries stored column-wise, keeping the most recent max_size rows"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # Trim in batches so eviction stays amortized O(1) per append
+        self._trim_slack = max(1, max_size // 10)
+        
+        self.timestamps = array('d')
+        self.levels = array('B')
+        self.operations = array('B')
+        self.messages: List[str] = []
+        self.file_paths: List[Optional[str]] = []
+        self.line_numbers: List[Optional[int]] = []
+        self.function_names: List[Optional[str]] = []
+        self.metadata: List[Optional[Dict[str, Any]]] = []
+    
+    def append(self, timestamp: float, level: LogLevel, operation_type: OperationType,
+               message: str, file_path: Optional[str], line_number: Optional[int],
+               function_name: Optional[str], metadata: Optional[Dict[str, Any]]):
+        """Append one log row"""
+        self.timestamps.append(timestamp)
+        self.levels.append(_LEVEL_INDEX[level])
+        self.operations.append(_OPERATION_INDEX[operation_type])
+        self.messages.append(message)
+        self.file_paths.append(file_path)
+        self.line_numbers.append(line_number)
+        self.function_names.append(function_name)
+        self.metadata.append(metadata)
+        
+        if len(self.timestamps) > self.max_size + self._trim_slack:
+            self._evict(len(self.timestamps) - self.max_size)
+    
+    def _evict(self, count: int):
+        """Drop the oldest count rows from every column"""
+        for column in (self.timestamps, self.levels, self.operations, self.messages,
+                       self.file_paths, self.line_numbers, self.function_names, self.metadata):
+            del column[:count]
+    
+    def __len__(self) -> int:
+        return min(len(self.timestamps), self.max_size)
+    
+    def _start(self) -> int:
+        """Index of the oldest retained row"""
+        return len(self.timestamps) - len(self)
+    
+    def __iter__(self):
+        """Iterate rows as LogEntry objects"""
+        for i in range(self._start(), len(self.timestamps)):
+            yield LogEntry(
+                timestamp=self.timestamps[i],
+                level=_LEVELS[self.levels[i]],
+                operation_type=_OPERATIONS[self.operations[i]],
+                message=self.messages[i],
+                file_path=self.file_paths[i],
+                line_number=self.line_numbers[i],
+                function_name=self.function_names[i],
+                metadata=self.metadata[i]
+            )
+    
+    def iter_dicts(self):
+        """Iterate rows as export dicts without building LogEntry objects"""
+        for i in range(self._start(), len(self.timestamps)):
+            timestamp = self.timestamps[i]
+            yield {
+                'timestamp': timestamp,
+                'datetime': _isoformat(timestamp),
+                'level': _LEVEL_VALUE_BY_INDEX[self.levels[i]],
+                'operation_type': _OPERATION_VALUE_BY_INDEX[self.operations[i]],
+                'message': self.messages[i],
+                'file_path': self.file_paths[i],
+                'line_number': self.line_numbers[i],
+                'function_name': self.function_names[i],
+                'metadata': self.metadata[i] or {}
+            }
+
+
 class RefactorLogger:
     """Main logger for refactoring operations"""
     
@@ -182,7 +397,9 @@ class RefactorLogger:
                  enable_console_logging: bool = True,
                  log_level: LogLevel = LogLevel.INFO,
                  max_log_files: int = 10,
-                 max_file_size: int = 10 * 1024 * 1024):  # 10MB
+                 max_file_size: int = 10 * 1024 * 1024,  # 10MB
+                 max_in_memory: int = 10000,
+                 diff_flush_threshold: int = 100):
         
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
@@ -192,99 +409,132 @@ class RefactorLogger:
         self.log_level = log_level
         self.max_log_files = max_log_files
         self.max_file_size = max_file_size
-        
-        # Storage for different types of logs
-        self.log_entries: List[LogEntry] = []
+        self.max_in_memory = max_in_memory
+        self.diff_flush_threshold = diff_flush_threshold
+        
+        # Storage for different types of logs. Entries (column-wise) and
+        # metrics keep the most recent max_in_memory items; diffs (which
+        # hold full source text) are spilled to disk in batches until
+        # export_logs reads them back, and close() removes the spill file
+        self.log_entries = LogColumns(max_in_memory)
         self.diff_entries: List[DiffEntry] = []
-        self.performance_metrics: List[PerformanceMetrics] = []
+        self.performance_metrics: Deque[PerformanceMetrics] = deque(maxlen=max_in_memory)
+        self.diff_spill_file: Optional[Path] = None
+        
+        # Session totals, unaffected by ring-buffer eviction and spills
+        self.total_log_entries = 0
+        self.total_diffs = 0
+        self.total_operations = 0
+        self._operation_counts: Counter = Counter()
+        self._level_counts: Counter = Counter()
+        self._duration_sum = 0.0
+        self._duration_min = 0.0
+        self._duration_max = 0.0
         
         # Active operations tracking
         self.active_operations: Dict[str, float] = {}
         
-        # Setup file logging
-        self._setup_file_logging()
+        # Python logger; handlers are attached below when enabled
+        self.logger = logging.getLogger('refactor_engine')
+        self._queue_handler: Optional[logging.handlers.QueueHandler] = None
+        self._queue_listener: Optional[logging.handlers.QueueListener] = None
+        self._min_level = _LEVEL_NUMBERS[log_level]
+        self._forward_to_logger = enable_file_logging or enable_console_logging
         
-        # Setup console logging
-        self._setup_console_logging()
+        # Setup file and console logging
+        self._setup_handlers()
         
         # Session info
-        self.session_id = self._generate_session_id()
         self.session_start = time.time()
+        self.session_id = self._generate_session_id()
+        
+        # Sequence for default operation IDs (unique within the session)
+        self._operation_seq = itertools.count(1)
         
         self.log(LogLevel.INFO, OperationType.FILE_SCAN, 
                 f"RefactorLogger initialized - Session: {self.session_id}")
     
-    def _setup_file_logging(self):
-        """Setup file logging"""
-        if not self.enable_file_logging:
+    def _setup_handlers(self):
+        """Attach file and console handlers to the Python logger"""
+        if not self._forward_to_logger:
             return
         
-        # Create log files
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        self.main_log_file = self.log_dir / f"refactor_{timestamp}.log"
-        self.diff_log_file = self.log_dir / f"diffs_{timestamp}.json"
-        self.performance_log_file = self.log_dir / f"performance_{timestamp}.json"
+        self.logger.setLevel(self._min_level)
         
-        # Setup Python logging
-        self.logger = logging.getLogger('refactor_engine')
-        self.logger.setLevel(getattr(logging, self.log_level.value.upper()))
-        
-        # File handler
-        file_handler = logging.FileHandler(self.main_log_file)
-        file_handler.setLevel(getattr(logging, self.log_level.value.upper()))
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        file_handler.setFormatter(formatter)
-        
-        self.logger.addHandler(file_handler)
+        if self.enable_file_logging:
+            # Create log files
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            
+            self.main_log_file = self.log_dir / f"refactor_{timestamp}.log"
+            self.diff_log_file = self.log_dir / f"diffs_{timestamp}.json"
+            self.performance_log_file = self.log_dir / f"performance_{timestamp}.json"
+            
+            # Rotating file handler, fed from a queue by a background
+            # listener thread so logging calls never block on file I/O
+            file_handler = logging.handlers.RotatingFileHandler(
+                self.main_log_file,
+                maxBytes=self.max_file_size,
+                backupCount=self.max_log_files
+            )
+            file_handler.setLevel(self._min_level)
+            file_handler.setFormatter(logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            ))
+            
+            log_queue = queue.SimpleQueue()
+            self._queue_handler = logging.handlers.QueueHandler(log_queue)
+            self._queue_listener = logging.handlers.QueueListener(log_queue, file_handler)
+            self._queue_listener.start()
+            self.logger.addHandler(self._queue_handler)
+            
+            # Flush queued records if the logger is never closed explicitly
+            atexit.register(self.close)
+        
+        if self.enable_console_logging:
+            # Console handler (more compact format)
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(self._min_level)
+            console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+            self.logger.addHandler(console_handler)
     
-    def _setup_console_logging(self):
-        """Setup console logging"""
-        if not self.enable_console_logging:
-            return
-        
-        if not hasattr(self, 'logger'):
-            self.logger = logging.getLogger('refactor_engine')
-            self.logger.setLevel(getattr(logging, self.log_level.value.upper()))
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(getattr(logging, self.log_level.value.upper()))
-        
-        # Formatter for console (more compact)
-        formatter = logging.Formatter('%(levelname)s: %(message)s')
-        console_handler.setFormatter(formatter)
-        
-        self.logger.addHandler(console_handler)
+    def close(self):
+        """Flush queued log records, stop the background file writer and drop spilled diffs"""
+        if self.diff_spill_file is not None:
+            try:
+                self.diff_spill_file.unlink()
+            except OSError:
+                pass
+            self.diff_spill_file = None
+        
+        if self._queue_listener is not None:
+            self._queue_listener.stop()
+            self._queue_listener = None
+            self.logger.removeHandler(self._queue_handler)
+            self._queue_handler = None
+        atexit.unregister(self.close)
     
     def _generate_session_id(self) -> str:
         """Generate unique session ID"""
-        return f"session_{int(time.time())}_{os.getpid()}"
+        return f"session_{int(self.session_start)}_{os.getpid()}"
     
     def log(self, level: LogLevel, operation_type: OperationType, 
             message: str, file_path: str = None, line_number: int = None,
             function_name: str = None, metadata: Dict[str, Any] = None):
         """Log a message"""
+        # Drop messages below the configured level before building an entry
+        if _LEVEL_NUMBERS[level] < self._min_level:
+            return
         
-        entry = LogEntry(
-            timestamp=time.time(),
-            level=level,
-            operation_type=operation_type,
-            message=message,
-            file_path=file_path,
-            line_number=line_number,
-            function_name=function_name,
-            metadata=metadata
+        self.log_entries.append(
+            time.time(), level, operation_type, message,
+            file_path, line_number, function_name, metadata
         )
-        
-        self.log_entries.append(entry)
+        self.total_log_entries += 1
+        self._operation_counts[_OPERATION_VALUES[operation_type]] += 1
+        self._level_counts[_LEVEL_VALUES[level]] += 1
         
         # Log to Python logger if available
-        if hasattr(self, 'logger'):
+        if self._forward_to_logger:
             log_msg = message
             if file_path:
                 log_msg += f" [{file_path}"
@@ -292,7 +542,7 @@ class RefactorLogger:
                     log_msg += f":{line_number}"
                 log_msg += "]"
             
-            getattr(self.logger, level.value)(log_msg)
+            self.logger.log(_LEVEL_NUMBERS[level], log_msg)
     
     def log_diff(self, file_path: str, original_code: str, refactored_code: str,
                 language: str, operation_id: str, changes_summary: Dict[str, Any]):
@@ -309,26 +559,58 @@ class RefactorLogger:
         )
         
         self.diff_entries.append(diff_entry)
+        self.total_diffs += 1
         
-        # Log summary
+        # Log summary (line counts only; the full diff statistics are
+        # computed lazily when the diff is exported)
         self.log(
             LogLevel.INFO, OperationType.TRANSFORMATION,
-            f"Code diff recorded: {diff_entry.lines_changed} lines changed, "
-            f"similarity: {diff_entry.similarity_ratio:.2%}",
+            f"Code diff recorded: {len(diff_entry.original_lines)} -> "
+            f"{len(diff_entry.refactored_lines)} lines",
             file_path=file_path,
             metadata={
                 'operation_id': operation_id,
-                'lines_added': diff_entry.lines_added,
-                'lines_changed': diff_entry.lines_changed,
-                'similarity_ratio': diff_entry.similarity_ratio
+                'lines_added': diff_entry.lines_added
             }
         )
+        
+        if len(self.diff_entries) >= self.diff_flush_threshold:
+            self._spill_diffs()
+    
+    def _spill_diffs(self):
+        """Append buffered diffs to a JSONL sidecar file and release their source text"""
+        if self.diff_spill_file is None:
+            self.diff_spill_file = self.log_dir / f"spilled_diffs_{self.session_id}.jsonl"
+            # Removed by close(), whether or not file logging is enabled
+            atexit.register(self.close)
+        
+        # Raw sources and metadata only: spilling runs inside log_diff, so
+        # diff statistics are left to export_logs
+        lines = [
+            _dumps({name: getattr(diff, name) for name in _DIFF_FIELDS})
+            for diff in self.diff_entries
+        ]
+        lines.append(b'')
+        
+        with open(self.diff_spill_file, 'ab', buffering=_EXPORT_BUFFER_SIZE) as f:
+            f.write(b'\n'.join(lines))
+        
+        self.diff_entries.clear()
+    
+    def _iter_diffs(self) -> Iterable[DiffEntry]:
+        """Every diff of the session: those spilled to disk, then the buffered ones"""
+        if self.diff_spill_file is not None:
+            with open(self.diff_spill_file, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        yield DiffEntry(**json.loads(line))
+        yield from self.diff_entries
     
     def start_operation(self, operation_type: OperationType, 
                        operation_id: str = None, file_path: str = None) -> str:
         """Start tracking an operation"""
         if operation_id is None:
-            operation_id = f"{operation_type.value}_{int(time.time() * 1000)}"
+            operation_id = f"{_OPERATION_VALUES[operation_type]}_{next(self._operation_seq)}"
         
         self.active_operations[operation_id] = time.time()
         
@@ -370,6 +652,13 @@ class RefactorLogger:
         )
         
         self.performance_metrics.append(metrics)
+        self.total_operations += 1
+        self._duration_sum += duration
+        if self.total_operations == 1:
+            self._duration_min = self._duration_max = duration
+        else:
+            self._duration_min = min(self._duration_min, duration)
+            self._duration_max = max(self._duration_max, duration)
         
         # Log completion
         status = "completed" if success else "failed"
@@ -430,41 +719,26 @@ class RefactorLogger:
         current_time = time.time()
         session_duration = current_time - self.session_start
         
-        # Count operations by type
-        operation_counts = {}
-        for entry in self.log_entries:
-            op_type = entry.operation_type.value
-            operation_counts[op_type] = operation_counts.get(op_type, 0) + 1
-        
-        # Count log levels
-        level_counts = {}
-        for entry in self.log_entries:
-            level = entry.level.value
-            level_counts[level] = level_counts.get(level, 0) + 1
-        
         # Performance statistics
-        if self.performance_metrics:
-            durations = [m.duration for m in self.performance_metrics]
-            avg_duration = sum(durations) / len(durations)
-            max_duration = max(durations)
-            min_duration = min(durations)
+        if self.total_operations:
+            avg_duration = self._duration_sum / self.total_operations
         else:
-            avg_duration = max_duration = min_duration = 0
+            avg_duration = 0
         
         return {
             'session_id': self.session_id,
             'session_start': self.session_start,
             'session_duration': session_duration,
-            'total_log_entries': len(self.log_entries),
-            'total_diffs': len(self.diff_entries),
-            'total_operations': len(self.performance_metrics),
+            'total_log_entries': self.total_log_entries,
+            'total_diffs': self.total_diffs,
+            'total_operations': self.total_operations,
             'active_operations': len(self.active_operations),
-            'operation_counts': operation_counts,
-            'level_counts': level_counts,
+            'operation_counts': dict(self._operation_counts),
+            'level_counts': dict(self._level_counts),
             'performance': {
                 'avg_operation_duration': avg_duration,
-                'max_operation_duration': max_duration,
-                'min_operation_duration': min_duration
+                'max_operation_duration': self._duration_max,
+                'min_operation_duration': self._duration_min
             }
         }
     
@@ -479,50 +753,60 @@ class RefactorLogger:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         files_created = {}
         
+        self._precompute_diff_stats(self.diff_entries)
+        
         # Export main logs
         main_log_file = output_dir / f"refactor_logs_{timestamp}.json"
-        with open(main_log_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'session_summary': self.get_session_summary(),
-                'log_entries': [entry.to_dict() for entry in self.log_entries]
-            }, f, indent=2, default=str)
+        self._write_json_stream(
+            main_log_file,
+            {'session_summary': self.get_session_summary()},
+            'log_entries', self.log_entries.iter_dicts()
+        )
         files_created['main_logs'] = str(main_log_file)
         
-        # Export diffs
-        if self.diff_entries:
+        # Export diffs, including those spilled earlier in the session
+        has_diffs = bool(self.diff_entries) or self.diff_spill_file is not None
+        if has_diffs:
             diff_log_file = output_dir / f"code_diffs_{timestamp}.json"
-            with open(diff_log_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'session_id': self.session_id,
-                    'diffs': [diff.to_dict() for diff in self.diff_entries]
-                }, f, indent=2, default=str)
+            self._write_json_stream(
+                diff_log_file, {'session_id': self.session_id},
+                'diffs', (diff.to_dict() for diff in self._iter_diffs())
+            )
             files_created['diffs'] = str(diff_log_file)
         
         # Export performance metrics
         if self.performance_metrics:
             perf_log_file = output_dir / f"performance_{timestamp}.json"
-            with open(perf_log_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'session_id': self.session_id,
-                    'metrics': [metric.to_dict() for metric in self.performance_metrics]
-                }, f, indent=2, default=str)
+            self._write_json_stream(
+                perf_log_file, {'session_id': self.session_id},
+                'metrics', (metric.to_dict() for metric in self.performance_metrics)
+            )
             files_created['performance'] = str(perf_log_file)
         
         # Export unified diff files
-        if self.diff_entries:
+        if has_diffs:
             diff_text_file = output_dir / f"unified_diffs_{timestamp}.txt"
-            with open(diff_text_file, 'w', encoding='utf-8') as f:
-                f.write(f"Unified Diffs - Session: {self.session_id}\n")
-                f.write("=" * 80 + "\n\n")
+            buffer = bytearray(f"Unified Diffs - Session: {self.session_id}\n".encode('utf-8'))
+            buffer += _SECTION_SEPARATOR[1:]
+            
+            with open(diff_text_file, 'wb', buffering=0) as f:
+                for diff in self._iter_diffs():
+                    buffer += (
+                        f"File: {diff.file_path}\n"
+                        f"Operation: {diff.operation_id}\n"
+                        f"Language: {diff.language}\n"
+                        f"Timestamp: {datetime.fromtimestamp(diff.timestamp)}\n"
+                    ).encode('utf-8')
+                    buffer += _DIFF_HEADER_RULE
+                    buffer += diff.get_unified_diff().encode('utf-8')
+                    buffer += _SECTION_SEPARATOR
+                    
+                    # Flush in large blocks, reusing the same buffer
+                    if len(buffer) >= _EXPORT_BUFFER_SIZE:
+                        f.write(buffer)
+                        buffer.clear()
                 
-                for diff in self.diff_entries:
-                    f.write(f"File: {diff.file_path}\n")
-                    f.write(f"Operation: {diff.operation_id}\n")
-                    f.write(f"Language: {diff.language}\n")
-                    f.write(f"Timestamp: {datetime.fromtimestamp(diff.timestamp)}\n")
-                    f.write("-" * 40 + "\n")
-                    f.write(diff.get_unified_diff())
-                    f.write("\n" + "=" * 80 + "\n\n")
+                f.write(buffer)
             
             files_created['unified_diffs'] = str(diff_text_file)
         
@@ -534,22 +818,71 @@ class RefactorLogger:
         
         return files_created
     
-    def cleanup_old_logs(self):
-        """Clean up old log files"""
-        if not self.enable_file_logging:
+    def _write_json_stream(self, path: Path, header: Dict[str, Any],
+                           key: str, items: Iterable[Dict[str, Any]]):
+        """Write {**header, key: [items...]} encoding one item at a time"""
+        with open(path, 'wb', buffering=_EXPORT_BUFFER_SIZE) as f:
+            # Reopen the encoded header object to append the streamed array
+            f.write(_dumps(header)[:-1])
+            if header:
+                f.write(b',')
+            f.write(_dumps(key) + b':[')
+            for index, item in enumerate(items):
+                if index:
+                    f.write(b',')
+                f.write(_dumps(item))
+            f.write(b']}')
+    
+    def _precompute_diff_stats(self, diffs: List[DiffEntry]):
+        """Compute pending diff statistics across worker processes"""
+        pending = [
+            d for d in diffs
+            if 'similarity_ratio' not in d.__dict__ and d.original_code != d.refactored_code
+        ]
+        if len(pending) <= _PARALLEL_DIFF_THRESHOLD:
+            return  # Not worth the pool start-up; computed lazily instead
+        
+        try:
+            with ProcessPoolExecutor() as executor:
+                results = list(executor.map(
+                    _compute_diff_stats,
+                    [d.original_code for d in pending],
+                    [d.refactored_code for d in pending],
+                    chunksize=4
+                ))
+        except (OSError, BrokenProcessPool) as e:
+            self.log(LogLevel.DEBUG, OperationType.TRANSFORMATION,
+                     f"Parallel diff statistics unavailable, computing serially: {e}")
             return
         
+        # Seed the cached properties with the worker results
+        for diff, (lines_changed, similarity_ratio) in zip(pending, results):
+            diff.__dict__['lines_changed'] = lines_changed
+            diff.__dict__['similarity_ratio'] = similarity_ratio
+    
+    def cleanup_old_logs(self):
+        """Clean up old log files and diffs spilled by earlier sessions"""
+        # Diffs are spilled even without file logging, so those are always pruned
+        suffixes = ('.log', '.json', '.jsonl') if self.enable_file_logging else ('.jsonl',)
+        
         try:
-            # Find all log files
-            log_files = list(self.log_dir.glob("*.log")) + list(self.log_dir.glob("*.json"))
+            # Find all log files (scandir reuses the directory entry's stat),
+            # except the spill file this session is still using
+            active_spill = f"spilled_diffs_{self.session_id}.jsonl"
+            with os.scandir(self.log_dir) as it:
+                log_files = [
+                    (entry.stat().st_mtime, entry.path) for entry in it
+                    if entry.name.endswith(suffixes)
+                    and entry.name != active_spill and entry.is_file()
+                ]
             
-            # Sort by modification time (oldest first)
-            log_files.sort(key=lambda f: f.stat().st_mtime)
+            excess = len(log_files) - self.max_log_files
+            if excess <= 0:
+                return
             
-            # Remove excess files
-            while len(log_files) > self.max_log_files:
-                old_file = log_files.pop(0)
-                old_file.unlink()
+            # Remove only the oldest excess files
+            for _, old_file in heapq.nsmallest(excess, log_files):
+                os.unlink(old_file)
                 self.log(
                     LogLevel.DEBUG, OperationType.FILE_SCAN,
                     f"Removed old log file: {old_file}"
@@ -580,4 +913,6 @@ class RefactorLogger:
         self.log(
             LogLevel.INFO, OperationType.FILE_SCAN,
             f"Session ended - Duration: {time.time() - self.session_start:.2f}s"
-        )
\ No newline at end of file
+        )
+        
+        self.close()
\ No newline at end of file
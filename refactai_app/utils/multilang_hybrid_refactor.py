@@ -14,14 +14,23 @@ Supported Languages:
 """
 
 import ast
+import asyncio
+import atexit
 import json
+import logging
 import re
+import shutil
 import subprocess
 import tempfile
 import os
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, Tuple, Union
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Any, Mapping, Optional, Tuple, Union
 from pathlib import Path
+from types import MappingProxyType
 
 try:
     from tree_sitter import Language, Parser, Node
@@ -37,14 +46,208 @@ except ImportError:
     cst = None
     LIBCST_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 from .ast_utils import ASTValidator
 
+logger = logging.getLogger(__name__)
+
+# First class name in a Java source, used to name the javac temp file
+_JAVA_CLASS_RE = re.compile(r'class\s+(\w+)')
+
+# Decodes the first JSON value in an LLM reply and ignores any trailing prose
+_JSON_DECODER = json.JSONDecoder()
+
+# Compiled grammar bundle produced by Language.build_library
+_LANGUAGE_LIBRARY = os.path.join('build', 'languages.so')
+
+# Parser objects are not thread-safe, so each thread keeps its own
+_PARSERS = threading.local()
+
+
+@lru_cache(maxsize=None)
+def _get_language(name: str) -> Any:
+    """Load a tree-sitter grammar once per process, or None if unavailable"""
+    if not TREE_SITTER_AVAILABLE or not os.path.exists(_LANGUAGE_LIBRARY):
+        return None
+    return Language(_LANGUAGE_LIBRARY, name)
+
+
+def _get_parser(name: str) -> Any:
+    """Return the calling thread's parser for a grammar, creating it on first use"""
+    parsers = _PARSERS.__dict__
+    parser = parsers.get(name)
+    if parser is None:
+        language = _get_language(name)
+        if language is None:
+            return None
+        parser = Parser()
+        parser.set_language(language)
+        parsers[name] = parser
+    return parser
+
+
+# Environment for validator subprocesses, instead of copying all of os.environ
+_VALIDATOR_ENV = {
+    key: os.environ[key]
+    for key in ('PATH', 'HOME', 'JAVA_HOME', 'TMPDIR', 'LANG', 'SYSTEMROOT')
+    if key in os.environ
+}
+
+_SCRATCH = threading.local()
+
+
+@lru_cache(maxsize=None)
+def _scratch_root() -> str:
+    """Private directory for validator source files, removed at exit"""
+    path = tempfile.mkdtemp(prefix='refactai_')
+    atexit.register(shutil.rmtree, path, True)
+    return path
+
+
+def _scratch_dir() -> str:
+    """The calling thread's own subdirectory of the scratch root"""
+    directory = getattr(_SCRATCH, 'directory', None)
+    if directory is None:
+        directory = os.path.join(_scratch_root(), str(threading.get_ident()))
+        os.makedirs(directory, exist_ok=True)
+        _SCRATCH.directory = directory
+    return directory
+
+
+def _write_scratch_file(name: str, code: str) -> str:
+    """Write source to a reusable per-thread file and return its path"""
+    path = os.path.join(_scratch_dir(), name)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(code)
+    return path
+
+
+def _run_validator(command: List[str]) -> subprocess.CompletedProcess:
+    """Run a validator command with the trimmed environment"""
+    return subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        env=_VALIDATOR_ENV,
+        close_fds=False
+    )
+
+
+# Node.js loop that syntax-checks length-prefixed sources read from stdin.
+# Like `node --check`, a source passes if it compiles as a CommonJS module
+# body or, failing that, as an ES module. Without the ES module parser
+# (vm.SourceTextModule) a CommonJS failure is reported as undecided (ok: null)
+_NODE_CHECK_SCRIPT = r"""
+const vm = require('vm');
+const canParseModules = typeof vm.SourceTextModule === 'function';
+const params = ['exports', 'require', 'module', '__filename', '__dirname'];
+let buf = Buffer.alloc(0);
+process.stdin.on('data', (chunk) => {
+  buf = Buffer.concat([buf, chunk]);
+  for (;;) {
+    const nl = buf.indexOf(10);
+    if (nl < 0) return;
+    const size = parseInt(buf.subarray(0, nl).toString(), 10);
+    if (buf.length < nl + 1 + size) return;
+    const code = buf.subarray(nl + 1, nl + 1 + size).toString('utf8');
+    buf = buf.subarray(nl + 1 + size);
+    let verdict;
+    try {
+      vm.compileFunction(code, params);
+      verdict = {ok: true};
+    } catch (e) {
+      verdict = canParseModules ? {ok: false, error: String(e)} : {ok: null};
+      if (canParseModules) {
+        try {
+          new vm.SourceTextModule(code);
+          verdict = {ok: true};
+        } catch (moduleError) {
+          // Keep the CommonJS error, as node --check reports for plain scripts
+        }
+      }
+    }
+    process.stdout.write(JSON.stringify(verdict) + '\n');
+  }
+});
+"""
+
+
+class _PersistentValidator:
+    """Long-lived validator process fed length-prefixed sources over stdin"""
+    
+    def __init__(self, command: List[str]):
+        self.command = command
+        self.available = True
+        self._process = None
+        self._lock = threading.Lock()
+    
+    def _ensure_started(self) -> subprocess.Popen:
+        """Start the worker on first use or after it has exited"""
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=_VALIDATOR_ENV
+            )
+        return self._process
+    
+    def validate(self, code: str) -> Tuple[Optional[bool], Optional[str]]:
+        """Send one source to the worker and return its verdict (None when undecided)"""
+        payload = code.encode('utf-8')
+        with self._lock:
+            try:
+                process = self._ensure_started()
+            except OSError:
+                self.available = False
+                raise
+            try:
+                process.stdin.write(b'%d\n' % len(payload) + payload)
+                process.stdin.flush()
+                line = process.stdout.readline()
+            except OSError:
+                self._stop()
+                raise
+            if not line:
+                self._stop()
+                raise RuntimeError('Validator process exited unexpectedly')
+        verdict = json.loads(line)
+        return verdict['ok'], verdict.get('error')
+    
+    def _stop(self):
+        """Terminate the worker process if it is running"""
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+    
+    def close(self):
+        """Shut down the worker"""
+        with self._lock:
+            self._stop()
+
+
+# The flag exposes vm.SourceTextModule for the ES module parse
+_NODE_VALIDATOR = _PersistentValidator(['node', '--experimental-vm-modules', '-e', _NODE_CHECK_SCRIPT])
+atexit.register(_NODE_VALIDATOR.close)
+
 
 class LanguageAdapter(ABC):
     """Abstract base class for language-specific adapters"""
     
+    # Whether apply_transformations can change code without any LLM suggestions
+    rewrites_without_suggestions = False
+    
     @abstractmethod
-    def parse_code(self, code: str) -> Any:
+    def parse_code(self, code: str, file_path: Optional[str] = None) -> Any:
         """Parse code into language-specific AST/IR"""
         pass
     
@@ -64,7 +267,7 @@ class LanguageAdapter(ABC):
         pass
     
     @abstractmethod
-    def get_language_info(self) -> Dict[str, Any]:
+    def get_language_info(self) -> Mapping[str, Any]:
         """Get language-specific information"""
         pass
 
@@ -72,11 +275,36 @@ class LanguageAdapter(ABC):
 class PythonAdapter(LanguageAdapter):
     """Python language adapter using ast and libcst"""
     
+    # Boolean comparisons are simplified even when the LLM suggests nothing
+    rewrites_without_suggestions = True
+    
+    _FEATURES = ('variable_renaming', 'docstring_insertion', 'loop_optimization')
+    _INFO_LIBCST = MappingProxyType({
+        'name': 'Python',
+        'extensions': ('.py', '.pyw'),
+        'parser': 'libcst',
+        'features': _FEATURES
+    })
+    _INFO_AST = MappingProxyType({
+        'name': 'Python',
+        'extensions': ('.py', '.pyw'),
+        'parser': 'ast',
+        'features': _FEATURES
+    })
+    
     def __init__(self):
         self.validator = ASTValidator()
         self.use_libcst = LIBCST_AVAILABLE
+        self._info = self._INFO_LIBCST if self.use_libcst else self._INFO_AST
+        
+        # Tree type -> handler; anything else is treated as a stdlib ast tree
+        self._transform_dispatch = {ast.Module: self._transform_ast}
+        self._generate_dispatch = {ast.Module: self._generate_ast}
+        if LIBCST_AVAILABLE:
+            self._transform_dispatch[cst.Module] = self._transform_libcst
+            self._generate_dispatch[cst.Module] = self._generate_libcst
     
-    def parse_code(self, code: str) -> Union[ast.AST, Any]:
+    def parse_code(self, code: str, file_path: Optional[str] = None) -> Union[ast.AST, Any]:
         """Parse Python code using ast or libcst"""
         if self.use_libcst:
             try:
@@ -89,62 +317,199 @@ class PythonAdapter(LanguageAdapter):
     
     def apply_transformations(self, parsed_code: Any, suggestions: Dict[str, Any]) -> Any:
         """Apply transformations using Python AST"""
-        if isinstance(parsed_code, cst.Module):
-            transformer = LibCSTTransformer(suggestions)
-            return parsed_code.visit(transformer)
-        else:
-            transformer = PythonASTTransformer(suggestions)
-            return transformer.visit(parsed_code)
+        handler = self._transform_dispatch.get(type(parsed_code), self._transform_ast)
+        return handler(parsed_code, suggestions)
+    
+    @staticmethod
+    def _transform_libcst(parsed_code: Any, suggestions: Dict[str, Any]) -> Any:
+        transformer = LibCSTTransformer(suggestions)
+        return parsed_code.visit(transformer)
+    
+    @staticmethod
+    def _transform_ast(parsed_code: ast.AST, suggestions: Dict[str, Any]) -> ast.AST:
+        transformer = PythonASTTransformer(suggestions)
+        return transformer.visit(parsed_code)
     
     def generate_code(self, transformed_ast: Any) -> str:
         """Generate Python code from AST"""
-        if isinstance(transformed_ast, cst.Module):
-            return transformed_ast.code
-        else:
-            import astor
-            return astor.to_source(transformed_ast)
+        handler = self._generate_dispatch.get(type(transformed_ast), self._generate_ast)
+        return handler(transformed_ast)
+    
+    @staticmethod
+    def _generate_libcst(transformed_ast: Any) -> str:
+        return transformed_ast.code
+    
+    @staticmethod
+    def _generate_ast(transformed_ast: ast.AST) -> str:
+        if hasattr(ast, 'unparse'):
+            # Python 3.9+
+            return ast.unparse(transformed_ast)
+        import astor
+        return astor.to_source(transformed_ast)
     
     def validate_syntax(self, code: str) -> Tuple[bool, Optional[str]]:
         """Validate Python syntax"""
         return self.validator.validate_python_code(code)
     
-    def get_language_info(self) -> Dict[str, Any]:
-        return {
-            'name': 'Python',
-            'extensions': ['.py', '.pyw'],
-            'parser': 'libcst' if self.use_libcst else 'ast',
-            'features': ['variable_renaming', 'docstring_insertion', 'loop_optimization']
-        }
+    def get_language_info(self) -> Mapping[str, Any]:
+        return self._info
 
 
-class JavaScriptAdapter(LanguageAdapter):
-    """JavaScript/JSX adapter using tree-sitter"""
+# Number of per-file trees kept for incremental re-parsing
+_TREE_CACHE_SIZE = 10
+
+
+def _common_prefix_length(a: memoryview, b: memoryview) -> int:
+    """Length of the shared prefix of two byte buffers, by binary search over slice compares"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _point_at(source: bytes, offset: int) -> Tuple[int, int]:
+    """Tree-sitter (row, byte column) of a byte offset"""
+    row = source.count(b'\n', 0, offset)
+    return row, offset - (source.rfind(b'\n', 0, offset) + 1)
+
+
+def _source_edit(old: bytes, new: bytes) -> Dict[str, Any]:
+    """Describe the single changed span between two sources as Tree.edit arguments"""
+    old_view, new_view = memoryview(old), memoryview(new)
+    start = _common_prefix_length(old_view, new_view)
+    # Match the suffix only within what is left after the prefix
+    limit = min(len(old), len(new)) - start
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if old_view[len(old) - mid:] == new_view[len(new) - mid:]:
+            low = mid
+        else:
+            high = mid - 1
+    old_end, new_end = len(old) - low, len(new) - low
+    return {
+        'start_byte': start,
+        'old_end_byte': old_end,
+        'new_end_byte': new_end,
+        'start_point': _point_at(new, start),
+        'old_end_point': _point_at(old, old_end),
+        'new_end_point': _point_at(new, new_end),
+    }
+
+
+class TreeSitterAdapter(LanguageAdapter):
+    """Base class for adapters backed by a shared tree-sitter grammar"""
+    
+    grammar = ''
+    display_name = ''
     
     def __init__(self):
-        self.parser = None
         self.language = None
+        self._last_encoded: Tuple[Optional[str], bytes] = (None, b'')
+        self._tree_cache: 'OrderedDict[str, Tuple[bytes, Any]]' = OrderedDict()
+        self._tree_cache_lock = threading.Lock()
         if TREE_SITTER_AVAILABLE:
             self._init_parser()
     
     def _init_parser(self):
-        """Initialize tree-sitter parser for JavaScript"""
+        """Attach the process-wide tree-sitter grammar for this language"""
         try:
-            # This would require tree-sitter-javascript to be installed
-            # Language.build_library('build/languages.so', ['tree-sitter-javascript'])
-            # self.language = Language('build/languages.so', 'javascript')
-            # self.parser = Parser()
-            # self.parser.set_language(self.language)
-            pass
+            # Requires Language.build_library('build/languages.so', [...grammars])
+            self.language = _get_language(self.grammar)
         except Exception as e:
-            print(f"Warning: Could not initialize JavaScript parser: {e}")
+            logger.warning("Could not initialize %s parser: %s", self.display_name, e)
+    
+    @property
+    def parser(self) -> Any:
+        """Tree-sitter parser owned by the calling thread"""
+        if self.language is None:
+            return None
+        return _get_parser(self.grammar)
+    
+    def _encode(self, code: Union[str, bytes]) -> bytes:
+        """UTF-8 encode source, reusing the bytes when the same string is seen again"""
+        if isinstance(code, bytes):
+            return code
+        last_code, last_bytes = self._last_encoded
+        if code is last_code:
+            return last_bytes
+        encoded = code.encode('utf-8')
+        self._last_encoded = (code, encoded)
+        return encoded
+    
+    def _parse_tree(self, code: Union[str, bytes], file_path: Optional[str] = None) -> Any:
+        """Parse source, reusing the previous tree for the same file as an incremental base
+        
+        The cache holds its own tree per file, never one handed to a caller, and
+        a parse takes it out of the cache while editing it, so neither callers
+        nor concurrent parses of the same file see a tree change underneath them.
+        """
+        source = self._encode(code)
+        cached = None
+        if file_path:
+            with self._tree_cache_lock:
+                cached = self._tree_cache.pop(file_path, None)
+        
+        if cached is None:
+            tree = self.parser.parse(source)
+        else:
+            previous_source, previous_tree = cached
+            previous_tree.edit(**_source_edit(previous_source, source))
+            tree = self.parser.parse(source, previous_tree)
+        
+        if file_path:
+            # Re-parsing with an unedited base reuses every node, so the
+            # cache's private copy is cheap
+            private_tree = self.parser.parse(source, tree)
+            with self._tree_cache_lock:
+                self._tree_cache[file_path] = (source, private_tree)
+                if len(self._tree_cache) > _TREE_CACHE_SIZE:
+                    self._tree_cache.popitem(last=False)
+        return tree
+    
+    def _ts_validate(self, code: Union[str, bytes]) -> Tuple[bool, Optional[str]]:
+        """Validate syntax in-process with the tree-sitter parser"""
+        tree = self.parser.parse(self._encode(code))
+        if not tree.root_node.has_error:
+            return True, None
+        return False, self._first_error(tree)
+    
+    @staticmethod
+    def _first_error(tree: Any) -> str:
+        """Describe the first ERROR or missing node in a parse tree"""
+        stack = [tree.root_node]
+        while stack:
+            node = stack.pop()
+            if node.type == 'ERROR' or node.is_missing:
+                row, column = node.start_point
+                return f"Syntax error at line {row + 1}, column {column + 1}"
+            if node.has_error:
+                stack.extend(reversed(node.children))
+        return "Syntax error"
+
+
+class JavaScriptAdapter(TreeSitterAdapter):
+    """JavaScript/JSX adapter using tree-sitter"""
+    
+    grammar = 'javascript'
+    display_name = 'JavaScript'
+    _INFO = MappingProxyType({
+        'name': 'JavaScript',
+        'extensions': ('.js', '.jsx', '.mjs'),
+        'parser': 'tree-sitter',
+        'features': ('variable_renaming', 'function_optimization', 'es6_conversion')
+    })
     
-    def parse_code(self, code: str) -> Any:
-        """Parse JavaScript code using tree-sitter"""
+    def parse_code(self, code: Union[str, bytes], file_path: Optional[str] = None) -> Any:
+        """Parse JavaScript code using tree-sitter, incrementally when file_path was seen before"""
         if not self.parser:
             raise NotImplementedError("Tree-sitter JavaScript parser not available")
         
-        tree = self.parser.parse(bytes(code, 'utf8'))
-        return tree
+        return self._parse_tree(code, file_path)
     
     def apply_transformations(self, parsed_code: Any, suggestions: Dict[str, Any]) -> Any:
         """Apply transformations to JavaScript AST"""
@@ -158,20 +523,28 @@ class JavaScriptAdapter(LanguageAdapter):
         raise NotImplementedError("JavaScript code generation not yet implemented")
     
     def validate_syntax(self, code: str) -> Tuple[bool, Optional[str]]:
-        """Validate JavaScript syntax using Node.js"""
+        """Validate JavaScript syntax, in-process when a parser is available"""
+        if self.language is not None:
+            return self._ts_validate(code)
+        return self._validate_with_node(code)
+    
+    def _validate_with_node(self, code: str) -> Tuple[bool, Optional[str]]:
+        """Validate JavaScript syntax using a resident Node.js worker"""
+        if _NODE_VALIDATOR.available:
+            try:
+                is_valid, error = _NODE_VALIDATOR.validate(code)
+                if is_valid is not None:
+                    return is_valid, error
+            except (OSError, RuntimeError, ValueError):
+                pass
+        return self._validate_with_node_check(code)
+    
+    def _validate_with_node_check(self, code: str) -> Tuple[bool, Optional[str]]:
+        """Validate JavaScript syntax using node --check on a temporary file"""
         try:
             # Use Node.js to validate syntax
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.js', delete=False) as f:
-                f.write(code)
-                temp_file = f.name
-            
-            result = subprocess.run(
-                ['node', '--check', temp_file],
-                capture_output=True,
-                text=True
-            )
-            
-            os.unlink(temp_file)
+            temp_file = _write_scratch_file('validate.js', code)
+            result = _run_validator(['node', '--check', temp_file])
             
             if result.returncode == 0:
                 return True, None
@@ -181,38 +554,28 @@ class JavaScriptAdapter(LanguageAdapter):
         except Exception as e:
             return False, f"Validation error: {str(e)}"
     
-    def get_language_info(self) -> Dict[str, Any]:
-        return {
-            'name': 'JavaScript',
-            'extensions': ['.js', '.jsx', '.mjs'],
-            'parser': 'tree-sitter',
-            'features': ['variable_renaming', 'function_optimization', 'es6_conversion']
-        }
+    def get_language_info(self) -> Mapping[str, Any]:
+        return self._INFO
 
 
-class JavaAdapter(LanguageAdapter):
+class JavaAdapter(TreeSitterAdapter):
     """Java adapter using tree-sitter"""
     
-    def __init__(self):
-        self.parser = None
-        if TREE_SITTER_AVAILABLE:
-            self._init_parser()
-    
-    def _init_parser(self):
-        """Initialize tree-sitter parser for Java"""
-        try:
-            # This would require tree-sitter-java to be installed
-            pass
-        except Exception as e:
-            print(f"Warning: Could not initialize Java parser: {e}")
+    grammar = 'java'
+    display_name = 'Java'
+    _INFO = MappingProxyType({
+        'name': 'Java',
+        'extensions': ('.java',),
+        'parser': 'tree-sitter',
+        'features': ('variable_renaming', 'method_optimization', 'javadoc_insertion')
+    })
     
-    def parse_code(self, code: str) -> Any:
-        """Parse Java code using tree-sitter"""
+    def parse_code(self, code: Union[str, bytes], file_path: Optional[str] = None) -> Any:
+        """Parse Java code using tree-sitter, incrementally when file_path was seen before"""
         if not self.parser:
             raise NotImplementedError("Tree-sitter Java parser not available")
         
-        tree = self.parser.parse(bytes(code, 'utf8'))
-        return tree
+        return self._parse_tree(code, file_path)
     
     def apply_transformations(self, parsed_code: Any, suggestions: Dict[str, Any]) -> Any:
         """Apply transformations to Java AST"""
@@ -223,30 +586,29 @@ class JavaAdapter(LanguageAdapter):
         """Generate Java code from AST"""
         raise NotImplementedError("Java code generation not yet implemented")
     
-    def validate_syntax(self, code: str) -> Tuple[bool, Optional[str]]:
+    def validate_syntax(self, code: str, semantic: bool = False) -> Tuple[bool, Optional[str]]:
+        """Validate Java syntax in-process, compiling with javac only when semantic checks are requested"""
+        if self.language is not None and not semantic:
+            return self._ts_validate(code)
+        return self._validate_with_javac(code)
+    
+    def _validate_with_javac(self, code: str) -> Tuple[bool, Optional[str]]:
         """Validate Java syntax using javac"""
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.java', delete=False) as f:
-                # Extract class name from code for proper file naming
-                class_match = re.search(r'class\s+(\w+)', code)
-                if class_match:
-                    class_name = class_match.group(1)
-                    f.name = f.name.replace('.java', f'_{class_name}.java')
-                
-                f.write(code)
-                temp_file = f.name
-            
-            result = subprocess.run(
-                ['javac', '-cp', '.', temp_file],
-                capture_output=True,
-                text=True
-            )
+            # Name the file after the class so javac accepts a public class
+            class_match = _JAVA_CLASS_RE.search(code)
+            class_name = class_match.group(1) if class_match else 'Validator'
+            temp_file = _write_scratch_file(f'{class_name}.java', code)
+            output_dir = os.path.dirname(temp_file)
             
-            # Clean up
-            os.unlink(temp_file)
-            class_file = temp_file.replace('.java', '.class')
-            if os.path.exists(class_file):
-                os.unlink(class_file)
+            try:
+                result = _run_validator(['javac', '-cp', '.', '-d', output_dir, temp_file])
+            finally:
+                # Clean up the source and any generated class files
+                with os.scandir(output_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(('.java', '.class')):
+                            os.unlink(entry.path)
             
             if result.returncode == 0:
                 return True, None
@@ -256,38 +618,28 @@ class JavaAdapter(LanguageAdapter):
         except Exception as e:
             return False, f"Validation error: {str(e)}"
     
-    def get_language_info(self) -> Dict[str, Any]:
-        return {
-            'name': 'Java',
-            'extensions': ['.java'],
-            'parser': 'tree-sitter',
-            'features': ['variable_renaming', 'method_optimization', 'javadoc_insertion']
-        }
+    def get_language_info(self) -> Mapping[str, Any]:
+        return self._INFO
 
 
-class CppAdapter(LanguageAdapter):
+class CppAdapter(TreeSitterAdapter):
     """C/C++ adapter using tree-sitter"""
     
-    def __init__(self):
-        self.parser = None
-        if TREE_SITTER_AVAILABLE:
-            self._init_parser()
-    
-    def _init_parser(self):
-        """Initialize tree-sitter parser for C/C++"""
-        try:
-            # This would require tree-sitter-cpp to be installed
-            pass
-        except Exception as e:
-            print(f"Warning: Could not initialize C/C++ parser: {e}")
+    grammar = 'cpp'
+    display_name = 'C/C++'
+    _INFO = MappingProxyType({
+        'name': 'C++',
+        'extensions': ('.cpp', '.cxx', '.cc', '.c', '.h', '.hpp'),
+        'parser': 'tree-sitter',
+        'features': ('variable_renaming', 'function_optimization', 'modern_cpp_conversion')
+    })
     
-    def parse_code(self, code: str) -> Any:
-        """Parse C/C++ code using tree-sitter"""
+    def parse_code(self, code: Union[str, bytes], file_path: Optional[str] = None) -> Any:
+        """Parse C/C++ code using tree-sitter, incrementally when file_path was seen before"""
         if not self.parser:
             raise NotImplementedError("Tree-sitter C/C++ parser not available")
         
-        tree = self.parser.parse(bytes(code, 'utf8'))
-        return tree
+        return self._parse_tree(code, file_path)
     
     def apply_transformations(self, parsed_code: Any, suggestions: Dict[str, Any]) -> Any:
         """Apply transformations to C/C++ AST"""
@@ -299,37 +651,95 @@ class CppAdapter(LanguageAdapter):
         raise NotImplementedError("C/C++ code generation not yet implemented")
     
     def validate_syntax(self, code: str) -> Tuple[bool, Optional[str]]:
+        """Validate C/C++ syntax, in-process when a parser is available"""
+        if self.language is not None:
+            return self._ts_validate(code)
+        return self._validate_with_compiler(code)
+    
+    def _validate_with_compiler(self, code: str) -> Tuple[bool, Optional[str]]:
         """Validate C/C++ syntax using gcc/clang"""
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.cpp', delete=False) as f:
-                f.write(code)
-                temp_file = f.name
+            temp_file = _write_scratch_file('validate.cpp', code)
             
             # Try gcc first, then clang
             for compiler in ['g++', 'clang++']:
-                result = subprocess.run(
-                    [compiler, '-fsyntax-only', temp_file],
-                    capture_output=True,
-                    text=True
-                )
+                result = _run_validator([compiler, '-fsyntax-only', temp_file])
                 
                 if result.returncode == 0:
-                    os.unlink(temp_file)
                     return True, None
             
-            os.unlink(temp_file)
             return False, result.stderr
                 
         except Exception as e:
             return False, f"Validation error: {str(e)}"
     
-    def get_language_info(self) -> Dict[str, Any]:
-        return {
-            'name': 'C++',
-            'extensions': ['.cpp', '.cxx', '.cc', '.c', '.h', '.hpp'],
-            'parser': 'tree-sitter',
-            'features': ['variable_renaming', 'function_optimization', 'modern_cpp_conversion']
-        }
+    def get_language_info(self) -> Mapping[str, Any]:
+        return self._INFO
+
+
+def _build_language_prompt(language: str) -> str:
+    """Create language-specific LLM prompt"""
+    base_prompt = f"""You are a {language} code analysis expert. Analyze the provided code and return a JSON response with improvement suggestions.
+
+Return ONLY a valid JSON object with this structure:
+{{
+    "suggestions": ["list of improvement suggestions"],
+    "rename": {{"old_name": "new_name"}},
+    "docstrings": {{"function_name": "docstring content"}},
+    "transformations": [
+        {{"type": "transformation_type", "location": "line_number", "description": "what to do"}}
+    ]
+}}
+
+Focus on:
+1. Better variable/function names
+2. Missing documentation
+3. Language-specific optimizations
+4. Code structure improvements
+
+Do NOT include code in your response, only analysis and suggestions."""
+    
+    # Add language-specific guidance
+    if language == 'python':
+        base_prompt += "\n\nPython-specific focus: PEP 8 compliance, list comprehensions, context managers, type hints."
+    elif language == 'javascript':
+        base_prompt += "\n\nJavaScript-specific focus: ES6+ features, async/await, destructuring, arrow functions."
+    elif language == 'java':
+        base_prompt += "\n\nJava-specific focus: OOP principles, generics, streams, proper exception handling."
+    elif language == 'cpp':
+        base_prompt += "\n\nC++-specific focus: Modern C++ features, RAII, smart pointers, const correctness."
+    
+    return base_prompt
+
+
+# Prompts depend only on the language, so the supported ones are built once
+_LANGUAGE_PROMPTS = {
+    language: _build_language_prompt(language)
+    for language in ('python', 'javascript', 'java', 'cpp')
+}
+
+
+# Number of file paths whose extension-based language is remembered
+_DETECT_CACHE_SIZE = 4096
+
+
+# Per-process engine used by refactor_files workers
+_WORKER_LLM_CLIENT = None
+_WORKER_REFACTOR = None
+
+
+def _init_refactor_worker(llm_client):
+    """Record the LLM client a refactor_files worker should use"""
+    global _WORKER_LLM_CLIENT
+    _WORKER_LLM_CLIENT = llm_client
+
+
+def _refactor_one(file_path: str) -> Dict[str, Any]:
+    """Refactor a single file with this process's cached engine"""
+    global _WORKER_REFACTOR
+    if _WORKER_REFACTOR is None:
+        _WORKER_REFACTOR = MultilangHybridRefactor(_WORKER_LLM_CLIENT)
+    return _WORKER_REFACTOR._refactor_file(file_path)
 
 
 class MultilangHybridRefactor:
@@ -338,13 +748,15 @@ class MultilangHybridRefactor:
     def __init__(self, llm_client=None):
         self.llm_client = llm_client
         
-        # Initialize language adapters
-        self.adapters = {
-            'python': PythonAdapter(),
-            'javascript': JavaScriptAdapter(),
-            'java': JavaAdapter(),
-            'cpp': CppAdapter()
+        # Language adapters are created on first use
+        self._adapter_factories = {
+            'python': PythonAdapter,
+            'javascript': JavaScriptAdapter,
+            'java': JavaAdapter,
+            'cpp': CppAdapter
         }
+        self._adapters: Dict[str, LanguageAdapter] = {}
+        self._detect_cache: 'OrderedDict[str, Optional[str]]' = OrderedDict()
         
         # File extension to language mapping
         self.extension_map = {
@@ -362,12 +774,34 @@ class MultilangHybridRefactor:
             '.hpp': 'cpp'
         }
     
+    @property
+    def adapters(self) -> Dict[str, LanguageAdapter]:
+        """All language adapters, instantiating any not yet created"""
+        return {language: self._get_adapter(language) for language in self._adapter_factories}
+    
+    def _get_adapter(self, language: str) -> Optional[LanguageAdapter]:
+        """Return the adapter for a language, creating it on first use"""
+        adapter = self._adapters.get(language)
+        if adapter is None:
+            factory = self._adapter_factories.get(language)
+            if factory is None:
+                return None
+            adapter = self._adapters[language] = factory()
+        return adapter
+    
     def detect_language(self, file_path: str, code: str = None) -> Optional[str]:
         """Detect programming language from file extension or content"""
-        # First try file extension
-        ext = Path(file_path).suffix.lower()
-        if ext in self.extension_map:
-            return self.extension_map[ext]
+        # First try file extension, remembered per path
+        try:
+            language = self._detect_cache[file_path]
+            self._detect_cache.move_to_end(file_path)
+        except KeyError:
+            language = self.extension_map.get(Path(file_path).suffix.lower())
+            self._detect_cache[file_path] = language
+            if len(self._detect_cache) > _DETECT_CACHE_SIZE:
+                self._detect_cache.popitem(last=False)
+        if language:
+            return language
         
         # Fallback to content-based detection
         if code:
@@ -389,145 +823,286 @@ class MultilangHybridRefactor:
         
         return None
     
+    def _refactor_file(self, file_path: str) -> Dict[str, Any]:
+        """Read and refactor one file, tagging the result with its path"""
+        try:
+            code = Path(file_path).read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError) as e:
+            result = {
+                'success': False,
+                'refactored_code': '',
+                'error': f'Could not read file: {str(e)}',
+                'original_valid': True,
+                'refactored_valid': True,
+                'validation_warnings': [],
+                'improvements': [],
+                'llm_suggestions': [],
+                'transformations': []
+            }
+        else:
+            result = self.refactor_code(code, file_path=file_path)
+        result['file_path'] = file_path
+        return result
+    
+    def refactor_files(self, paths: Iterable[str], max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Refactor many files across a process pool, yielding results in input order
+        
+        The LLM client is sent to each worker, so it must be picklable.
+        """
+        paths = [str(path) for path in paths]
+        if len(paths) <= 1 or max_workers == 1:
+            for file_path in paths:
+                yield self._refactor_file(file_path)
+            return
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(paths))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_refactor_worker,
+                                 initargs=(self.llm_client,)) as executor:
+            yield from executor.map(_refactor_one, paths, chunksize=8)
+    
     def get_supported_languages(self) -> List[str]:
         """Get list of supported languages"""
-        return list(self.adapters.keys())
+        return list(self._adapter_factories)
     
-    def get_language_info(self, language: str) -> Dict[str, Any]:
+    def get_language_info(self, language: str) -> Mapping[str, Any]:
         """Get information about a specific language"""
-        if language in self.adapters:
-            return self.adapters[language].get_language_info()
+        adapter = self._get_adapter(language)
+        if adapter is not None:
+            return adapter.get_language_info()
         return {}
     
-    def refactor_code(self, code: str, language: str = None, file_path: str = '') -> Dict[str, Any]:
-        """Main refactoring method for multilanguage support"""
+    def refactor_code(self, code: str, language: str = None, file_path: str = '',
+                      trust_input: bool = False) -> Dict[str, Any]:
+        """Main refactoring method for multilanguage support
+        
+        Pass trust_input=True when the caller has already checked that `code`
+        is syntactically valid; the original is then not revalidated.
+        """
         try:
-            # Detect language if not provided
-            if not language:
-                language = self.detect_language(file_path, code)
-                if not language:
-                    return {
-                        'success': False,
-                        'refactored_code': code,
-                        'error': 'Could not detect programming language',
-                        'original_valid': True,
-                        'refactored_valid': True,
-                        'validation_warnings': [],
-                        'improvements': [],
-                        'llm_suggestions': [],
-                        'transformations': []
-                    }
-            
-            # Check if language is supported
-            if language not in self.adapters:
-                return {
-                    'success': False,
-                    'refactored_code': code,
-                    'error': f'Language {language} not supported',
-                    'original_valid': True,
-                    'refactored_valid': True,
-                    'validation_warnings': [],
-                    'improvements': [],
-                    'llm_suggestions': [],
-                    'transformations': []
-                }
-            
-            adapter = self.adapters[language]
+            language, adapter, failure = self._select_adapter(code, language, file_path)
+            if failure is not None:
+                return failure
             
             # Phase 1: LLM Analysis
             llm_suggestions = self._get_llm_suggestions(code, language, file_path)
+            if not self._has_work(adapter, llm_suggestions):
+                return self._unchanged_result(code, language, adapter, llm_suggestions, trust_input)
             
             # Phase 2: Parse code
-            try:
-                parsed_code = adapter.parse_code(code)
-            except Exception as e:
-                return {
-                    'success': False,
-                    'refactored_code': code,
-                    'error': f'Parse error: {str(e)}',
-                    'original_valid': False,
-                    'refactored_valid': True,
-                    'validation_warnings': [],
-                    'improvements': [],
-                    'llm_suggestions': llm_suggestions.get('suggestions', []),
-                    'transformations': []
-                }
+            parsed_code, parse_error = self._parse_safely(adapter, code, file_path)
+            return self._finish_refactor(code, language, adapter, llm_suggestions,
+                                         parsed_code, parse_error, trust_input)
             
-            # Phase 3: Apply transformations
-            try:
-                transformed_ast = adapter.apply_transformations(parsed_code, llm_suggestions)
-            except Exception as e:
-                return {
-                    'success': False,
-                    'refactored_code': code,
-                    'error': f'Transformation error: {str(e)}',
-                    'original_valid': True,
-                    'refactored_valid': True,
-                    'validation_warnings': [],
-                    'improvements': [],
-                    'llm_suggestions': llm_suggestions.get('suggestions', []),
-                    'transformations': []
-                }
+        except Exception as e:
+            return {
+                'success': False,
+                'refactored_code': code,
+                'error': f'Multilang refactoring error: {str(e)}',
+                'original_valid': True,
+                'refactored_valid': True,
+                'validation_warnings': [],
+                'improvements': [],
+                'llm_suggestions': [],
+                'transformations': []
+            }
+    
+    async def refactor_code_async(self, code: str, language: str = None, file_path: str = '',
+                                  trust_input: bool = False) -> Dict[str, Any]:
+        """Async refactor_code that parses locally while the LLM request is in flight"""
+        try:
+            language, adapter, failure = self._select_adapter(code, language, file_path)
+            if failure is not None:
+                return failure
             
-            # Phase 4: Generate code
-            try:
-                refactored_code = adapter.generate_code(transformed_ast)
-            except Exception as e:
-                return {
+            suggestions_task = asyncio.create_task(
+                asyncio.to_thread(self._get_llm_suggestions, code, language, file_path)
+            )
+            # Phases 1 and 2 overlap: parse locally while the LLM request is in flight
+            parsed_code, parse_error = await asyncio.to_thread(self._parse_safely, adapter, code, file_path)
+            llm_suggestions = await suggestions_task
+            if not self._has_work(adapter, llm_suggestions):
+                return self._unchanged_result(code, language, adapter, llm_suggestions, trust_input)
+            return self._finish_refactor(code, language, adapter, llm_suggestions,
+                                         parsed_code, parse_error, trust_input)
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'refactored_code': code,
+                'error': f'Multilang refactoring error: {str(e)}',
+                'original_valid': True,
+                'refactored_valid': True,
+                'validation_warnings': [],
+                'improvements': [],
+                'llm_suggestions': [],
+                'transformations': []
+            }
+    
+    def _select_adapter(self, code: str, language: Optional[str],
+                        file_path: str) -> Tuple[Optional[str], Optional[LanguageAdapter], Optional[Dict[str, Any]]]:
+        """Resolve the language and adapter, or the failure result to return instead"""
+        # Detect language if not provided
+        if not language:
+            language = self.detect_language(file_path, code)
+            if not language:
+                return language, None, {
                     'success': False,
                     'refactored_code': code,
-                    'error': f'Code generation error: {str(e)}',
+                    'error': 'Could not detect programming language',
                     'original_valid': True,
                     'refactored_valid': True,
                     'validation_warnings': [],
                     'improvements': [],
-                    'llm_suggestions': llm_suggestions.get('suggestions', []),
+                    'llm_suggestions': [],
                     'transformations': []
                 }
-            
-            # Phase 5: Validation
-            original_valid, orig_error = adapter.validate_syntax(code)
-            refactored_valid, ref_error = adapter.validate_syntax(refactored_code)
-            
-            warnings = []
-            if not original_valid:
-                warnings.append(f'Original code has syntax errors: {orig_error}')
-            if not refactored_valid:
-                warnings.append(f'Refactored code has syntax errors: {ref_error}')
-                # If refactored code is invalid, return original
-                refactored_code = code
-                refactored_valid = original_valid
-            
-            improvements = []
-            if refactored_code != code:
-                improvements.append(f'Applied {language} refactoring transformations')
-            
+        
+        # Check if language is supported
+        adapter = self._get_adapter(language)
+        if adapter is None:
+            return language, None, {
+                'success': False,
+                'refactored_code': code,
+                'error': f'Language {language} not supported',
+                'original_valid': True,
+                'refactored_valid': True,
+                'validation_warnings': [],
+                'improvements': [],
+                'llm_suggestions': [],
+                'transformations': []
+            }
+        
+        return language, adapter, None
+    
+    @staticmethod
+    def _has_work(adapter: LanguageAdapter, llm_suggestions: Dict[str, Any]) -> bool:
+        """Whether the transformation phases could change the code at all"""
+        return (adapter.rewrites_without_suggestions or
+                bool(llm_suggestions.get('rename')) or
+                bool(llm_suggestions.get('transformations')) or
+                bool(llm_suggestions.get('docstrings')))
+    
+    def _unchanged_result(self, code: str, language: str, adapter: LanguageAdapter,
+                          llm_suggestions: Dict[str, Any], trust_input: bool) -> Dict[str, Any]:
+        """Result for code that no phase would change, validated once"""
+        if trust_input:
+            valid, error = True, None
+        else:
+            valid, error = adapter.validate_syntax(code)
+        
+        warnings = []
+        if not valid:
+            warnings.append(f'Original code has syntax errors: {error}')
+        
+        return {
+            'success': True,
+            'refactored_code': code,
+            'error': '',
+            'original_valid': valid,
+            'refactored_valid': valid,
+            'validation_warnings': warnings,
+            'improvements': [],
+            'llm_suggestions': llm_suggestions.get('suggestions', []),
+            'transformations': [],
+            'language': language,
+            'adapter_info': dict(adapter.get_language_info())
+        }
+    
+    @staticmethod
+    def _parse_safely(adapter: LanguageAdapter, code: str, file_path: str) -> Tuple[Any, Optional[Exception]]:
+        """Parse code, returning (tree, None) or (None, exception)"""
+        try:
+            return adapter.parse_code(code, file_path or None), None
+        except Exception as e:
+            return None, e
+    
+    def _finish_refactor(self, code: str, language: str, adapter: LanguageAdapter,
+                         llm_suggestions: Dict[str, Any], parsed_code: Any,
+                         parse_error: Optional[Exception], trust_input: bool) -> Dict[str, Any]:
+        """Transform, regenerate and validate parsed code into a refactor result"""
+        # Phase 2: Parse result
+        if parse_error is not None:
             return {
-                'success': True,
-                'refactored_code': refactored_code,
-                'error': '',
-                'original_valid': original_valid,
-                'refactored_valid': refactored_valid,
-                'validation_warnings': warnings,
-                'improvements': improvements,
+                'success': False,
+                'refactored_code': code,
+                'error': f'Parse error: {str(parse_error)}',
+                'original_valid': False,
+                'refactored_valid': True,
+                'validation_warnings': [],
+                'improvements': [],
                 'llm_suggestions': llm_suggestions.get('suggestions', []),
-                'transformations': llm_suggestions.get('transformations', []),
-                'language': language,
-                'adapter_info': adapter.get_language_info()
+                'transformations': []
             }
-            
+        
+        # Phase 3: Apply transformations
+        try:
+            transformed_ast = adapter.apply_transformations(parsed_code, llm_suggestions)
         except Exception as e:
             return {
                 'success': False,
                 'refactored_code': code,
-                'error': f'Multilang refactoring error: {str(e)}',
+                'error': f'Transformation error: {str(e)}',
                 'original_valid': True,
                 'refactored_valid': True,
                 'validation_warnings': [],
                 'improvements': [],
-                'llm_suggestions': [],
+                'llm_suggestions': llm_suggestions.get('suggestions', []),
+                'transformations': []
+            }
+        
+        # Phase 4: Generate code
+        try:
+            refactored_code = adapter.generate_code(transformed_ast)
+        except Exception as e:
+            return {
+                'success': False,
+                'refactored_code': code,
+                'error': f'Code generation error: {str(e)}',
+                'original_valid': True,
+                'refactored_valid': True,
+                'validation_warnings': [],
+                'improvements': [],
+                'llm_suggestions': llm_suggestions.get('suggestions', []),
                 'transformations': []
             }
+        
+        # Phase 5: Validation
+        if trust_input:
+            original_valid, orig_error = True, None
+        else:
+            original_valid, orig_error = adapter.validate_syntax(code)
+        if refactored_code == code:
+            refactored_valid, ref_error = original_valid, orig_error
+        else:
+            refactored_valid, ref_error = adapter.validate_syntax(refactored_code)
+        
+        warnings = []
+        if not original_valid:
+            warnings.append(f'Original code has syntax errors: {orig_error}')
+        if not refactored_valid:
+            warnings.append(f'Refactored code has syntax errors: {ref_error}')
+            # If refactored code is invalid, return original
+            refactored_code = code
+            refactored_valid = original_valid
+        
+        improvements = []
+        if refactored_code != code:
+            improvements.append(f'Applied {language} refactoring transformations')
+        
+        return {
+            'success': True,
+            'refactored_code': refactored_code,
+            'error': '',
+            'original_valid': original_valid,
+            'refactored_valid': refactored_valid,
+            'validation_warnings': warnings,
+            'improvements': improvements,
+            'llm_suggestions': llm_suggestions.get('suggestions', []),
+            'transformations': llm_suggestions.get('transformations', []),
+            'language': language,
+            # Plain copy so results stay JSON-serializable and picklable
+            'adapter_info': dict(adapter.get_language_info())
+        }
     
     def _get_llm_suggestions(self, code: str, language: str, file_path: str) -> Dict[str, Any]:
         """Get suggestions from LLM for the given language"""
@@ -550,45 +1125,29 @@ class MultilangHybridRefactor:
     
     def _create_language_specific_prompt(self, language: str) -> str:
         """Create language-specific LLM prompt"""
-        base_prompt = f"""You are a {language} code analysis expert. Analyze the provided code and return a JSON response with improvement suggestions.
-
-Return ONLY a valid JSON object with this structure:
-{{
-    "suggestions": ["list of improvement suggestions"],
-    "rename": {{"old_name": "new_name"}},
-    "docstrings": {{"function_name": "docstring content"}},
-    "transformations": [
-        {{"type": "transformation_type", "location": "line_number", "description": "what to do"}}
-    ]
-}}
-
-Focus on:
-1. Better variable/function names
-2. Missing documentation
-3. Language-specific optimizations
-4. Code structure improvements
-
-Do NOT include code in your response, only analysis and suggestions."""
-        
-        # Add language-specific guidance
-        if language == 'python':
-            base_prompt += "\n\nPython-specific focus: PEP 8 compliance, list comprehensions, context managers, type hints."
-        elif language == 'javascript':
-            base_prompt += "\n\nJavaScript-specific focus: ES6+ features, async/await, destructuring, arrow functions."
-        elif language == 'java':
-            base_prompt += "\n\nJava-specific focus: OOP principles, generics, streams, proper exception handling."
-        elif language == 'cpp':
-            base_prompt += "\n\nC++-specific focus: Modern C++ features, RAII, smart pointers, const correctness."
-        
-        return base_prompt
+        prompt = _LANGUAGE_PROMPTS.get(language)
+        if prompt is None:
+            prompt = _build_language_prompt(language)
+        return prompt
     
     def _parse_llm_response(self, response_content: str) -> Dict[str, Any]:
         """Parse LLM response into structured suggestions"""
         try:
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            # Decode the JSON object starting at the first brace
+            start = response_content.find('{')
+            if start >= 0:
+                if ORJSON_AVAILABLE:
+                    # Fast path: the reply is a bare object, possibly wrapped in prose
+                    end = response_content.rfind('}') + 1
+                    try:
+                        parsed = orjson.loads(response_content[start:end])
+                    except orjson.JSONDecodeError:
+                        parsed = None
+                    if isinstance(parsed, dict):
+                        return parsed
+                parsed, _ = _JSON_DECODER.raw_decode(response_content, start)
+                if isinstance(parsed, dict):
+                    return parsed
             return {'suggestions': [], 'transformations': []}
         except Exception:
             return {'suggestions': [], 'transformations': []}
@@ -602,12 +1161,19 @@ class PythonASTTransformer(ast.NodeTransformer):
         self.suggestions = suggestions
         self.rename_map = suggestions.get('rename', {})
         self.transformations = suggestions.get('transformations', [])
+        if not self.rename_map:
+            # Nothing to rename, so Name nodes are returned untouched
+            self.visit_Name = self._keep_node
+    
+    @staticmethod
+    def _keep_node(node):
+        return node
     
     def visit_Name(self, node):
-        """Rename variables"""
+        """Rename variables (a Name's only child is its ctx, so no descent is needed)"""
         if node.id in self.rename_map:
             node.id = self.rename_map[node.id]
-        return self.generic_visit(node)
+        return node
     
     def visit_If(self, node):
         """Simplify boolean comparisons"""
@@ -623,26 +1189,86 @@ class PythonASTTransformer(ast.NodeTransformer):
 
 if LIBCST_AVAILABLE:
     class LibCSTTransformer(cst.CSTTransformer):
-        """LibCST-based transformer for advanced Python refactoring"""
+        """LibCST-based transformer applying every suggestion kind in a single pass"""
         
         def __init__(self, suggestions: Dict[str, Any]):
             super().__init__()
             self.suggestions = suggestions
             self.changes_made = []
+            rename = suggestions.get('rename')
+            docstrings = suggestions.get('docstrings')
+            self.rename_map = rename if isinstance(rename, dict) else {}
+            self.docstrings = docstrings if isinstance(docstrings, dict) else {}
+            # Indentation of each enclosing block, for multi-line docstrings
+            self._default_indent = '    '
+            self._indents = []
+        
+        def visit_Module(self, node: cst.Module) -> bool:
+            self._default_indent = node.default_indent
+            return True
+        
+        def visit_IndentedBlock(self, node: cst.IndentedBlock) -> bool:
+            self._indents.append(self._default_indent if node.indent is None else node.indent)
+            return True
+        
+        def leave_IndentedBlock(self, original_node: cst.IndentedBlock,
+                                updated_node: cst.IndentedBlock) -> cst.IndentedBlock:
+            self._indents.pop()
+            return updated_node
         
         def leave_Name(self, original_node: cst.Name, updated_node: cst.Name) -> cst.Name:
             """Handle variable renaming"""
-            if 'rename' in self.suggestions:
-                old_name = original_node.value
-                if old_name in self.suggestions['rename']:
-                    new_name = self.suggestions['rename'][old_name]
-                    self.changes_made.append({
-                        'type': 'rename',
-                        'old_name': old_name,
-                        'new_name': new_name
-                    })
-                    return updated_node.with_changes(value=new_name)
+            old_name = original_node.value
+            new_name = self.rename_map.get(old_name)
+            if new_name:
+                self.changes_made.append({
+                    'type': 'rename',
+                    'old_name': old_name,
+                    'new_name': new_name
+                })
+                return updated_node.with_changes(value=new_name)
+            return updated_node
+        
+        def leave_If(self, original_node: cst.If, updated_node: cst.If) -> cst.If:
+            """Simplify `if x == True` to `if x`"""
+            test = updated_node.test
+            if (isinstance(test, cst.Comparison) and
+                len(test.comparisons) == 1 and
+                isinstance(test.comparisons[0].operator, cst.Equal) and
+                isinstance(test.comparisons[0].comparator, cst.Name) and
+                test.comparisons[0].comparator.value == 'True'):
+                self.changes_made.append({'type': 'simplify_boolean_compare'})
+                return updated_node.with_changes(test=test.left)
             return updated_node
+        
+        def leave_FunctionDef(self, original_node: cst.FunctionDef,
+                              updated_node: cst.FunctionDef) -> cst.FunctionDef:
+            """Insert suggested docstrings into functions that lack one"""
+            docstring = self.docstrings.get(original_node.name.value)
+            if not docstring or original_node.get_docstring() is not None:
+                return updated_node
+            body = updated_node.body
+            if not isinstance(body, cst.IndentedBlock):
+                return updated_node
+            # Escaping every quote keeps a trailing or tripled " from ending
+            # the literal early
+            escaped = str(docstring).replace('\\', '\\\\').replace('"', '\\"')
+            # Continuation lines line up with the function body
+            body_indent = ''.join(self._indents) + (
+                self._default_indent if body.indent is None else body.indent
+            )
+            first, *rest = escaped.split('\n')
+            escaped = '\n'.join([first] + [body_indent + line if line.strip() else '' for line in rest])
+            docstring_line = cst.SimpleStatementLine(
+                body=[cst.Expr(value=cst.SimpleString(f'"""{escaped}"""'))]
+            )
+            self.changes_made.append({
+                'type': 'docstring',
+                'function': original_node.name.value
+            })
+            return updated_node.with_changes(
+                body=body.with_changes(body=[docstring_line, *body.body])
+            )
 else:
     class LibCSTTransformer:
         """Fallback LibCST transformer when libcst is not available"""
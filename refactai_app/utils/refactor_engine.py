@@ -8,17 +8,65 @@ Combines LLM suggestions with AST-based safe transformations.
 
 import os
 import json
+import codecs
+import logging
 import time
-from typing import Dict, List, Any, Optional, Tuple
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Dict, FrozenSet, List, Any, Optional, Set, Tuple
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
 from enum import Enum
+from functools import cached_property, lru_cache
 
 # Import our modules
-from .llm_suggestor import LLMSuggestor, LLMResponse, OpenAIProvider, AnthropicProvider, LocalLLMProvider
-from .git_integrator import GitIntegrator, CodePattern
-from .multilang_hybrid_refactor import MultilangHybridRefactor, LanguageAdapter
+# Providers, Git integration and the hybrid refactorer are imported on first
+# use so AST-only and one-shot runs don't pay for them at startup
+from .llm_suggestor import LLMSuggestor, LLMResponse, MAX_PROMPT_CODE_CHARS
 from .language_adapters import LANGUAGE_ADAPTERS, EXTENSION_MAP
+from .file_scanner import FileScanner
+from .response_cache import ResponseCache, cache_key, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+# Instruction sent with every syntax-fix retry
+_SYNTAX_FIX_INSTRUCTION = (
+    "Focus on fixing syntax errors only. "
+    "Use the folder context to understand imports, dependencies, and patterns. "
+    "Preserve the original logic and functionality."
+)
+
+# Related files previewed in the folder context, and bytes read from each
+_FOLDER_CONTEXT_FILES = 5
+_FOLDER_CONTEXT_PREVIEW_BYTES = 2048
+
+# Syntax-fix steps applied between validations; a failing batch is bisected
+_SYNTAX_FIX_BATCH_SIZE = 8
+
+
+@lru_cache(maxsize=None)
+def _validation_adapter(language: str) -> Optional[Any]:
+    """Shared adapter used only for validate_syntax, which keeps no per-file state"""
+    adapter_class = LANGUAGE_ADAPTERS.get(language)
+    return adapter_class() if adapter_class else None
+
+
+@lru_cache(maxsize=256)
+def _validate_source(language: str, code: str) -> Tuple[str, ...]:
+    """Syntax errors in code, memoized so unchanged code is parsed once"""
+    # str caches its own hash, so repeat lookups of the same object don't
+    # rehash the source; validator exceptions propagate and aren't cached
+    adapter = _validation_adapter(language)
+    if adapter is None:
+        return (f"No syntax validator available for {language}",)
+    
+    if hasattr(adapter, 'validate_syntax'):
+        is_valid, error_msg = adapter.validate_syntax(code)
+        if not is_valid:
+            return (error_msg,)
+    return ()
 
 
 class RefactorMode(Enum):
@@ -30,7 +78,28 @@ class RefactorMode(Enum):
     AST_ONLY = "ast_only"        # Only AST transforms, no LLM
 
 
-@dataclass
+def _shallow_asdict(suggestion: Any) -> Dict[str, Any]:
+    """asdict() for suggestion records, whose fields are all plain values, without the deep copy"""
+    return {f.name: getattr(suggestion, f.name) for f in fields(suggestion)}
+
+
+def _keep_code(adapter: Any, code: str) -> str:
+    """AST applier for modes without a mode-specific transformation"""
+    return code
+
+
+# AST transformation call per mode; modes not listed leave the code as is
+_AST_APPLIERS: Dict[RefactorMode, Callable[[Any, str], str]] = {
+    # Only apply safe transformations
+    RefactorMode.CONSERVATIVE: lambda adapter, code: adapter.apply_safe_transformations(code),
+    # Apply safe and moderate transformations
+    RefactorMode.BALANCED: lambda adapter, code: adapter.apply_transformations(code, risk_level="moderate"),
+    # Apply all transformations
+    RefactorMode.AGGRESSIVE: lambda adapter, code: adapter.apply_transformations(code, risk_level="all"),
+}
+
+
+@dataclass(slots=True)
 class RefactorConfig:
     """Configuration for refactoring engine"""
     mode: RefactorMode = RefactorMode.BALANCED
@@ -49,13 +118,25 @@ class RefactorConfig:
     anthropic_api_key: Optional[str] = None
     local_llm_url: Optional[str] = None
     
+    # Multi-file batching: estimated prompt tokens and files per LLM request
+    llm_batch_token_budget: int = 6000
+    llm_batch_max_files: int = 8
+    
+    # LLM requests kept in flight at once by arefactor_files
+    max_concurrent_requests: int = 8
+    
+    # Persistent LLM response cache; set enable_response_cache=False for a no-cache run
+    enable_response_cache: bool = True
+    response_cache_dir: str = DEFAULT_CACHE_DIR
+    response_cache_max_bytes: int = DEFAULT_MAX_BYTES
+    
     # Language-specific settings
     python_style: str = "google"  # docstring style
     javascript_style: str = "jsdoc"
     java_style: str = "javadoc"
 
 
-@dataclass
+@dataclass(slots=True)
 class RefactorResult:
     """Result of refactoring operation"""
     success: bool
@@ -91,15 +172,29 @@ class RefactorEngine:
     def __init__(self, config: RefactorConfig = None):
         self.config = config or RefactorConfig()
         
-        # Initialize components
+        # Initialize components (Git and hybrid refactorer on first access)
         self.llm_suggestor = LLMSuggestor()
-        self.git_integrator = GitIntegrator()
-        self.multilang_refactor = MultilangHybridRefactor()
         
         # Setup LLM providers
         self._setup_llm_providers()
         
-        # Statistics
+        # AST applier for the configured mode, chosen once per engine
+        self._apply_ast = _AST_APPLIERS.get(self.config.mode, _keep_code)
+        
+        # Adapter instance per language and thread; constructing one probes for
+        # external tools (node, javac, gcc), so instances are reused across files,
+        # while arefactor_files may refactor files on several threads at once
+        self._thread_state = threading.local()
+        
+        # (code hash, validation errors) pairs whose folder-context retry failed
+        self._failed_retries: Set[Tuple[str, FrozenSet[str]]] = set()
+        
+        # Opened on the first LLM request, so AST-only runs never touch the disk cache
+        self._response_cache: Optional[ResponseCache] = None
+        self._response_cache_failed = False
+        
+        # Statistics, updated from arefactor_files worker threads as well
+        self._stats_lock = threading.Lock()
         self.stats = {
             'files_processed': 0,
             'total_suggestions': 0,
@@ -107,51 +202,173 @@ class RefactorEngine:
             'errors': 0
         }
     
+    def _get_adapter(self, language: str) -> Optional[Any]:
+        """Adapter for language, cleared of state left by the previous file"""
+        adapters = getattr(self._thread_state, 'adapters', None)
+        if adapters is None:
+            adapters = self._thread_state.adapters = {}
+        adapter = adapters.get(language)
+        if adapter is not None:
+            adapter.reset()
+            return adapter
+        
+        adapter_class = LANGUAGE_ADAPTERS.get(language)
+        if not adapter_class:
+            return None
+        adapter = adapters[language] = adapter_class()
+        return adapter
+    
+    @cached_property
+    def git_integrator(self):
+        """Git integration, created on first use"""
+        from .git_integrator import GitIntegrator
+        return GitIntegrator()
+    
+    @cached_property
+    def multilang_refactor(self):
+        """Hybrid refactorer, created on first use"""
+        from .multilang_hybrid_refactor import MultilangHybridRefactor
+        return MultilangHybridRefactor()
+    
     def _setup_llm_providers(self):
         """Setup available LLM providers based on config"""
+        # Each provider class is only imported when it is configured
         if self.config.openai_api_key:
             try:
+                from .llm_suggestor import OpenAIProvider
                 provider = OpenAIProvider(self.config.openai_api_key)
                 if provider.is_available():
                     self.llm_suggestor.add_provider(provider)
-                    print("✓ OpenAI provider added")
+                    logger.info("OpenAI provider added")
             except Exception as e:
-                print(f"Failed to setup OpenAI provider: {e}")
+                logger.warning("Failed to setup OpenAI provider: %s", e)
         
         if self.config.anthropic_api_key:
             try:
+                from .llm_suggestor import AnthropicProvider
                 provider = AnthropicProvider(self.config.anthropic_api_key)
                 if provider.is_available():
                     self.llm_suggestor.add_provider(provider)
-                    print("✓ Anthropic provider added")
+                    logger.info("Anthropic provider added")
             except Exception as e:
-                print(f"Failed to setup Anthropic provider: {e}")
+                logger.warning("Failed to setup Anthropic provider: %s", e)
         
         if self.config.local_llm_url:
             try:
+                from .llm_suggestor import LocalLLMProvider
                 provider = LocalLLMProvider(self.config.local_llm_url)
                 if provider.is_available():
                     self.llm_suggestor.add_provider(provider)
-                    print("✓ Local LLM provider added")
+                    logger.info("Local LLM provider added")
             except Exception as e:
-                print(f"Failed to setup local LLM provider: {e}")
+                logger.warning("Failed to setup local LLM provider: %s", e)
     
     def refactor_file(self, file_path: str) -> RefactorResult:
         """Refactor a single file"""
         start_time = time.time()
         file_path = Path(file_path).resolve()
         
+        original_code, language, error_result = self._read_source(file_path, start_time)
+        if error_result:
+            return error_result
+        
+        # Refactor the code
+        return self._refactor_code(original_code, language, str(file_path), start_time)
+    
+    def refactor_files(self, file_paths: List[str]) -> List[RefactorResult]:
+        """Refactor several files, sharing LLM requests between files of the same language"""
+        results: List[Optional[RefactorResult]] = [None] * len(file_paths)
+        pending = []
+        
+        for index, file_path in enumerate(file_paths):
+            start_time = time.time()
+            file_path = Path(file_path).resolve()
+            code, language, error_result = self._read_source(file_path, start_time)
+            if error_result:
+                results[index] = error_result
+                continue
+            
+            # Phase 0 runs up front so files with syntax errors never reach the LLM batch
+            if self.config.validate_syntax and self._validate_syntax(code, language):
+                results[index] = self._refactor_code(code, language, str(file_path), start_time)
+                continue
+            
+            # Phase 1 per file; Phase 2 is shared below
+            context = self._gather_context(code, language, str(file_path))
+            pending.append((index, code, language, str(file_path), start_time, context))
+        
+        batch_suggestions = {}
+        if pending and self.config.enable_llm_suggestions and self.config.mode != RefactorMode.AST_ONLY:
+            batch_suggestions = self._get_llm_suggestions_batch(pending)
+        
+        for index, code, language, file_path, start_time, context in pending:
+            results[index] = self._refactor_code(
+                code, language, file_path, start_time,
+                prefetched=(context, batch_suggestions.get(file_path))
+            )
+        
+        return results
+    
+    async def arefactor_files(self, file_paths: List[str]) -> List[RefactorResult]:
+        """Refactor files concurrently, with at most max_concurrent_requests files awaiting I/O"""
+        semaphore = asyncio.Semaphore(self.config.max_concurrent_requests)
+        
+        async def refactor_one(file_path: str) -> RefactorResult:
+            async with semaphore:
+                start_time = time.time()
+                try:
+                    return await self._arefactor_file(file_path)
+                except Exception as e:
+                    # One failing file must not cancel the rest of the gather
+                    return self._create_error_result(
+                        "", str(file_path), "unknown",
+                        f"Refactoring error: {e}", start_time
+                    )
+        
+        return list(await asyncio.gather(*(refactor_one(file_path) for file_path in file_paths)))
+    
+    async def _arefactor_file(self, file_path: str) -> RefactorResult:
+        """Refactor one file, awaiting file, Git and LLM I/O instead of blocking on it"""
+        start_time = time.time()
+        file_path = Path(file_path).resolve()
+        
+        code, language, error_result = await asyncio.to_thread(self._read_source, file_path, start_time)
+        if error_result:
+            return error_result
+        
+        # Phase 0 as in _refactor_code, before any I/O is spent on the file;
+        # parsing and the remaining phases are CPU bound and run off the event loop
+        if self.config.validate_syntax and await asyncio.to_thread(self._validate_syntax, code, language):
+            return await asyncio.to_thread(self._refactor_code, code, language, str(file_path), start_time)
+        
+        context = await asyncio.to_thread(self._gather_context, code, language, str(file_path))
+        llm_suggestions = None
+        if self.config.enable_llm_suggestions and self.config.mode != RefactorMode.AST_ONLY:
+            llm_suggestions = await self._get_llm_suggestions_async(code, language, context)
+        
+        return await asyncio.to_thread(self._refactor_code, code, language, str(file_path), start_time,
+                                       (context, llm_suggestions))
+    
+    def _read_source(self, file_path: Path, start_time: float) -> Tuple[str, Optional[str], Optional[RefactorResult]]:
+        """Read a file and detect its language, or return the error result that ends its refactoring"""
         try:
-            # Read file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                original_code = f.read()
+            # A UTF-8 character takes at most 4 bytes, so a file over 4x the
+            # limit in bytes is rejected without reading it
+            max_chars = self.config.max_file_size
+            too_large = os.path.getsize(file_path) > max_chars * 4
+            
+            if not too_large:
+                # Read file; one character past the limit is enough to reject it
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    original_code = f.read(max_chars + 1)
+                too_large = len(original_code) > max_chars
             
             # Check file size
-            if len(original_code) > self.config.max_file_size:
-                return RefactorResult(
+            if too_large:
+                return "", None, RefactorResult(
                     success=False,
-                    original_code=original_code,
-                    refactored_code=original_code,
+                    original_code="",
+                    refactored_code="",
                     language="unknown",
                     file_path=str(file_path),
                     renames_applied=[],
@@ -161,23 +378,22 @@ class RefactorEngine:
                     processing_time=time.time() - start_time,
                     llm_suggestions=None,
                     git_context=None,
-                    validation_errors=[f"File too large: {len(original_code)} > {self.config.max_file_size}"],
+                    validation_errors=[f"File too large: more than {max_chars} characters"],
                     warnings=[]
                 )
             
             # Detect language
             language = self._detect_language(file_path)
             if not language:
-                return self._create_error_result(
+                return original_code, None, self._create_error_result(
                     original_code, str(file_path), "unknown", 
                     "Unsupported file type", start_time
                 )
             
-            # Refactor the code
-            return self._refactor_code(original_code, language, str(file_path), start_time)
+            return original_code, language, None
             
         except Exception as e:
-            return self._create_error_result(
+            return "", None, self._create_error_result(
                 "", str(file_path), "unknown", 
                 f"Error reading file: {e}", start_time
             )
@@ -187,8 +403,12 @@ class RefactorEngine:
         start_time = time.time()
         return self._refactor_code(code, language, file_path, start_time)
     
-    def _refactor_code(self, code: str, language: str, file_path: str, start_time: float) -> RefactorResult:
-        """Core refactoring logic"""
+    def _refactor_code(self, code: str, language: str, file_path: str, start_time: float,
+                       prefetched: Optional[Tuple[Dict[str, Any], Optional[LLMResponse]]] = None) -> RefactorResult:
+        """Core refactoring logic
+        
+        prefetched carries (context, llm_suggestions) when the caller already ran phases 0-2.
+        """
         try:
             # Initialize result
             result = RefactorResult(
@@ -209,7 +429,7 @@ class RefactorEngine:
             )
             
             # Phase 0: Validate original code syntax FIRST
-            if self.config.validate_syntax:
+            if self.config.validate_syntax and prefetched is None:
                 original_syntax_errors = self._validate_syntax(code, language)
                 if original_syntax_errors:
                     result.validation_errors = original_syntax_errors
@@ -218,15 +438,20 @@ class RefactorEngine:
                     result.warnings.append("Original code contains syntax errors - aborting refactoring")
                     return result
             
-            # Phase 1: Gather context
-            context = self._gather_context(code, language, file_path)
-            result.git_context = context.get('git_context')
-            
-            # Phase 2: Get LLM suggestions (if enabled)
-            llm_suggestions = None
-            if self.config.enable_llm_suggestions and self.config.mode != RefactorMode.AST_ONLY:
-                llm_suggestions = self._get_llm_suggestions(code, language, context)
+            if prefetched is not None:
+                context, llm_suggestions = prefetched
+                result.git_context = context.get('git_context')
                 result.llm_suggestions = llm_suggestions
+            else:
+                # Phase 1: Gather context
+                context = self._gather_context(code, language, file_path)
+                result.git_context = context.get('git_context')
+                
+                # Phase 2: Get LLM suggestions (if enabled)
+                llm_suggestions = None
+                if self.config.enable_llm_suggestions and self.config.mode != RefactorMode.AST_ONLY:
+                    llm_suggestions = self._get_llm_suggestions(code, language, context)
+                    result.llm_suggestions = llm_suggestions
             
             # Phase 3: Apply AST transformations (if enabled)
             refactored_code = code
@@ -241,8 +466,8 @@ class RefactorEngine:
                     refactored_code, language, llm_suggestions, result
                 )
             
-            # Phase 5: Validate result
-            if self.config.validate_syntax:
+            # Phase 5: Validate result (Phase 0 already covered unchanged code)
+            if self.config.validate_syntax and refactored_code is not code:
                 validation_errors = self._validate_syntax(refactored_code, language)
                 result.validation_errors = validation_errors
                 
@@ -281,19 +506,21 @@ class RefactorEngine:
             result.lines_changed = self._count_changed_lines(code, refactored_code)
             
             # Update statistics
-            self.stats['files_processed'] += 1
-            if llm_suggestions:
-                self.stats['total_suggestions'] += (
-                    len(llm_suggestions.renames) + 
-                    len(llm_suggestions.docstrings) + 
-                    len(llm_suggestions.transformations)
-                )
-            self.stats['applied_changes'] += len(result.renames_applied) + len(result.docstrings_added) + len(result.transformations_applied)
+            with self._stats_lock:
+                self.stats['files_processed'] += 1
+                if llm_suggestions:
+                    self.stats['total_suggestions'] += (
+                        len(llm_suggestions.renames) + 
+                        len(llm_suggestions.docstrings) + 
+                        len(llm_suggestions.transformations)
+                    )
+                self.stats['applied_changes'] += len(result.renames_applied) + len(result.docstrings_added) + len(result.transformations_applied)
             
             return result
             
         except Exception as e:
-            self.stats['errors'] += 1
+            with self._stats_lock:
+                self.stats['errors'] += 1
             return self._create_error_result(
                 code, file_path, language, 
                 f"Refactoring error: {e}", start_time
@@ -305,7 +532,7 @@ class RefactorEngine:
             'file_path': file_path,
             'language': language,
             'file_size': len(code),
-            'line_count': len(code.split('\n'))
+            'line_count': code.count('\n') + 1
         }
         
         # Add Git context if enabled
@@ -321,42 +548,144 @@ class RefactorEngine:
     def _get_llm_suggestions(self, code: str, language: str, context: Dict[str, Any]) -> Optional[LLMResponse]:
         """Get suggestions from LLM"""
         try:
+            key, cached = self._lookup_cached_suggestions(code, language)
+            if cached is not None:
+                return cached
+            
             suggestions = self.llm_suggestor.get_suggestions(code, language, context)
             
             # Validate and filter suggestions
             validated_suggestions = self.llm_suggestor.validate_suggestions(suggestions, code, language)
             
+            self._store_cached_suggestions(key, validated_suggestions)
+            return validated_suggestions
+            
+        except Exception as e:
+            logger.error("Error getting LLM suggestions: %s", e)
+            return None
+    
+    async def _get_llm_suggestions_async(self, code: str, language: str, context: Dict[str, Any]) -> Optional[LLMResponse]:
+        """Get suggestions from LLM without blocking the event loop"""
+        try:
+            key, cached = self._lookup_cached_suggestions(code, language)
+            if cached is not None:
+                return cached
+            
+            suggestions = await self.llm_suggestor.get_suggestions_async(code, language, context)
+            
+            # Validate and filter suggestions
+            validated_suggestions = self.llm_suggestor.validate_suggestions(suggestions, code, language)
+            
+            self._store_cached_suggestions(key, validated_suggestions)
             return validated_suggestions
             
         except Exception as e:
-            print(f"Error getting LLM suggestions: {e}")
+            logger.error("Error getting LLM suggestions: %s", e)
             return None
     
+    def _get_llm_suggestions_batch(self, entries: List[Tuple]) -> Dict[str, Optional[LLMResponse]]:
+        """Get LLM suggestions for many files in as few requests as the batch budget allows"""
+        suggestions: Dict[str, Optional[LLMResponse]] = {}
+        cache_keys: Dict[str, Optional[str]] = {}
+        
+        # Group by language, then pack files into requests until the token estimate is spent
+        by_language: Dict[str, List[Tuple]] = {}
+        for entry in entries:
+            _, code, language, file_path, _, _ = entry
+            key, cached = self._lookup_cached_suggestions(code, language)
+            if cached is not None:
+                suggestions[file_path] = cached
+                continue
+            cache_keys[file_path] = key
+            by_language.setdefault(language, []).append(entry)
+        
+        batches = []
+        for language_entries in by_language.values():
+            batch, batch_tokens = [], 0
+            for entry in language_entries:
+                # Prompts embed at most MAX_PROMPT_CODE_CHARS, roughly 4 characters per token
+                tokens = min(len(entry[1]), MAX_PROMPT_CODE_CHARS) // 4
+                if batch and (batch_tokens + tokens > self.config.llm_batch_token_budget
+                              or len(batch) >= self.config.llm_batch_max_files):
+                    batches.append(batch)
+                    batch, batch_tokens = [], 0
+                batch.append(entry)
+                batch_tokens += tokens
+            if batch:
+                batches.append(batch)
+        
+        for batch in batches:
+            items = [
+                {'file_id': file_path, 'language': language, 'code': code, 'context': context}
+                for _, code, language, file_path, _, context in batch
+            ]
+            try:
+                responses = self.llm_suggestor.get_suggestions_batch(items)
+                for _, code, language, file_path, _, _ in batch:
+                    suggestions[file_path] = self.llm_suggestor.validate_suggestions(
+                        responses[file_path], code, language
+                    )
+                    self._store_cached_suggestions(cache_keys[file_path], suggestions[file_path])
+            except Exception as e:
+                logger.error("Error getting LLM suggestions: %s", e)
+        
+        return suggestions
+    
+    def _get_response_cache(self) -> Optional[ResponseCache]:
+        """Open the persistent response cache on first use, or None when disabled"""
+        if not self.config.enable_response_cache or self._response_cache_failed:
+            return None
+        if self._response_cache is None:
+            try:
+                self._response_cache = ResponseCache(
+                    self.config.response_cache_dir, self.config.response_cache_max_bytes
+                )
+            except Exception as e:
+                logger.warning("Response cache unavailable, continuing without it: %s", e)
+                self._response_cache_failed = True
+                return None
+        return self._response_cache
+    
+    def _lookup_cached_suggestions(self, code: str, language: str) -> Tuple[Optional[str], Optional[LLMResponse]]:
+        """Cache key for this request and the cached suggestions for it, if any"""
+        cache = self._get_response_cache()
+        if cache is None:
+            return None, None
+        try:
+            # Responses differ per provider and model, so they are part of the key
+            providers = ','.join(
+                f"{type(p).__name__}:{getattr(p, 'model', '')}" for p in self.llm_suggestor.providers
+            )
+            key = cache_key(code, language, self.config.mode.value, self.config.confidence_threshold, providers)
+            cached = cache.get(key)
+            if not isinstance(cached, dict):
+                return key, None
+            return key, LLMResponse.from_dict(cached)
+        except Exception:
+            return None, None
+    
+    def _store_cached_suggestions(self, key: Optional[str], suggestions: Optional[LLMResponse]) -> None:
+        """Persist suggestions under key; failed requests are not cached so they get retried"""
+        if key is None or suggestions is None or 'error' in suggestions.metadata:
+            return
+        try:
+            self._response_cache.set(key, asdict(suggestions))
+        except Exception as e:
+            logger.warning("Could not cache LLM suggestions: %s", e)
+    
     def _apply_ast_transformations(self, code: str, language: str, 
                                  llm_suggestions: Optional[LLMResponse], 
                                  result: RefactorResult) -> str:
         """Apply AST-based transformations"""
         try:
             # Get language adapter
-            adapter_class = LANGUAGE_ADAPTERS.get(language)
-            if not adapter_class:
+            adapter = self._get_adapter(language)
+            if adapter is None:
                 result.warnings.append(f"No AST adapter available for {language}")
                 return code
             
-            adapter = adapter_class()
-            
             # Apply transformations based on mode
-            if self.config.mode == RefactorMode.CONSERVATIVE:
-                # Only apply safe transformations
-                transformed_code = adapter.apply_safe_transformations(code)
-            elif self.config.mode == RefactorMode.BALANCED:
-                # Apply safe and moderate transformations
-                transformed_code = adapter.apply_transformations(code, risk_level="moderate")
-            elif self.config.mode == RefactorMode.AGGRESSIVE:
-                # Apply all transformations
-                transformed_code = adapter.apply_transformations(code, risk_level="all")
-            else:
-                transformed_code = code
+            transformed_code = self._apply_ast(adapter, code)
             
             # Track applied transformations
             if transformed_code != code:
@@ -378,17 +707,52 @@ class RefactorEngine:
         """Apply LLM suggestions to code"""
         try:
             # Get language adapter for safe application
-            adapter_class = LANGUAGE_ADAPTERS.get(language)
-            if not adapter_class:
+            adapter = self._get_adapter(language)
+            if adapter is None:
                 result.warnings.append(f"No adapter available for applying {language} suggestions")
                 return code
             
-            adapter = adapter_class()
             current_code = code
+            # Loop invariants, bound once rather than looked up per suggestion
+            threshold = self.config.confidence_threshold
+            skip = result.suggestions_skipped.append
             
             # Apply renames
+            renames = []
             for rename in suggestions.renames:
-                if rename.confidence >= self.config.confidence_threshold:
+                if rename.confidence >= threshold:
+                    renames.append(rename)
+                else:
+                    skip({
+                        'type': 'rename',
+                        'suggestion': _shallow_asdict(rename),
+                        'reason': f"Low confidence: {rename.confidence}"
+                    })
+            
+            if renames and hasattr(adapter, 'apply_renames'):
+                # One parse and one tree walk for all renames
+                try:
+                    current_code, applied = adapter.apply_renames(
+                        current_code, [(rename.old_name, rename.new_name) for rename in renames]
+                    )
+                except Exception as e:
+                    applied = [False] * len(renames)
+                    for rename in renames:
+                        skip({
+                            'type': 'rename',
+                            'suggestion': _shallow_asdict(rename),
+                            'reason': f"Application failed: {e}"
+                        })
+                for rename, was_applied in zip(renames, applied):
+                    if was_applied:
+                        result.renames_applied.append({
+                            'old_name': rename.old_name,
+                            'new_name': rename.new_name,
+                            'reason': rename.reason,
+                            'confidence': rename.confidence
+                        })
+            else:
+                for rename in renames:
                     try:
                         new_code = adapter.apply_rename(current_code, rename.old_name, rename.new_name)
                         if new_code != current_code:
@@ -400,17 +764,11 @@ class RefactorEngine:
                                 'confidence': rename.confidence
                             })
                     except Exception as e:
-                        result.suggestions_skipped.append({
+                        skip({
                             'type': 'rename',
-                            'suggestion': asdict(rename),
+                            'suggestion': _shallow_asdict(rename),
                             'reason': f"Application failed: {e}"
                         })
-                else:
-                    result.suggestions_skipped.append({
-                        'type': 'rename',
-                        'suggestion': asdict(rename),
-                        'reason': f"Low confidence: {rename.confidence}"
-                    })
             
             # Apply docstrings
             for docstring in suggestions.docstrings:
@@ -429,15 +787,15 @@ class RefactorEngine:
                             'style': docstring.style
                         })
                 except Exception as e:
-                    result.suggestions_skipped.append({
+                    skip({
                         'type': 'docstring',
-                        'suggestion': asdict(docstring),
+                        'suggestion': _shallow_asdict(docstring),
                         'reason': f"Application failed: {e}"
                     })
             
             # Apply safe transformations suggested by LLM
             for transform in suggestions.transformations:
-                if (transform.confidence >= self.config.confidence_threshold and 
+                if (transform.confidence >= threshold and 
                     transform.safety_level in ['safe', 'moderate']):
                     try:
                         new_code = adapter.apply_transformation(
@@ -454,15 +812,15 @@ class RefactorEngine:
                                 'confidence': transform.confidence
                             })
                     except Exception as e:
-                        result.suggestions_skipped.append({
+                        skip({
                             'type': 'transformation',
-                            'suggestion': asdict(transform),
+                            'suggestion': _shallow_asdict(transform),
                             'reason': f"Application failed: {e}"
                         })
                 else:
-                    result.suggestions_skipped.append({
+                    skip({
                         'type': 'transformation',
-                        'suggestion': asdict(transform),
+                        'suggestion': _shallow_asdict(transform),
                         'reason': f"Safety/confidence check failed"
                     })
             
@@ -476,9 +834,6 @@ class RefactorEngine:
                                   original_result: 'RefactorResult', 
                                   validation_errors: List[str]) -> 'RefactorResult':
         """Retry refactoring with full folder context when syntax errors persist"""
-        import time
-        from .file_scanner import FileScanner
-        
         start_time = time.time()
         
         try:
@@ -500,6 +855,14 @@ class RefactorEngine:
                 warnings=[]
             )
             
+            # A retry that already failed on this code with these errors will
+            # fail again; skip the folder scan and LLM round-trip
+            retry_key = (cache_key(code, language), frozenset(validation_errors))
+            if retry_key in self._failed_retries:
+                retry_result.warnings.append("Skipped retry - it already failed for these syntax errors")
+                retry_result.processing_time = time.time() - start_time
+                return retry_result
+            
             # Get folder context
             folder_context = self._gather_folder_context(file_path, language)
             
@@ -512,7 +875,7 @@ class RefactorEngine:
                 'file_path': file_path,
                 'language': language,
                 'file_size': len(code),
-                'line_count': len(code.split('\n')),
+                'line_count': code.count('\n') + 1,
                 'folder_context': folder_context,
                 'syntax_errors': validation_errors,
                 'retry_attempt': True
@@ -542,6 +905,9 @@ class RefactorEngine:
                     else:
                         retry_result.warnings.append("Retry with folder context still has syntax errors")
                         retry_result.refactored_code = code
+                        # Only answered-but-unfixed retries are remembered; a
+                        # missing LLM answer may be transient
+                        self._failed_retries.add(retry_key)
                 else:
                     retry_result.warnings.append("No LLM suggestions available for syntax fixing")
             else:
@@ -558,9 +924,6 @@ class RefactorEngine:
     def _gather_folder_context(self, file_path: str, language: str) -> Optional[Dict[str, Any]]:
         """Gather context from the entire folder structure"""
         try:
-            from .file_scanner import FileScanner
-            from pathlib import Path
-            
             file_path_obj = Path(file_path)
             folder_path = file_path_obj.parent
             
@@ -568,24 +931,32 @@ class RefactorEngine:
             scanner = FileScanner(max_file_size=512*1024)  # 512KB limit for context
             scan_result = scanner.scan_directory(str(folder_path), recursive=True)
             
-            # Filter files by language and proximity
-            related_files = []
-            for file_info in scan_result.supported_files:
-                if file_info.language == language and file_info.path != file_path_obj:
-                    # Read file content for context (limit size)
-                    try:
-                        with open(file_info.path, 'r', encoding='utf-8') as f:
-                            content = f.read()[:2048]  # First 2KB only
-                        related_files.append({
-                            'path': str(file_info.relative_path),
-                            'content_preview': content,
-                            'size': file_info.size_bytes
-                        })
-                    except Exception:
-                        continue
+            # Filter files by language and proximity; the smallest are the
+            # most relevant, so only those get read
+            candidates = sorted(
+                (file_info for file_info in scan_result.supported_files
+                 if file_info.language == language and file_info.path != file_path_obj),
+                key=lambda file_info: file_info.size_bytes
+            )
             
-            # Limit to most relevant files (max 5)
-            related_files = sorted(related_files, key=lambda x: x['size'])[:5]
+            related_files = []
+            for file_info in candidates:
+                if len(related_files) == _FOLDER_CONTEXT_FILES:
+                    break
+                # Read file content for context (limit size)
+                try:
+                    with open(file_info.path, 'rb') as f:
+                        head = f.read(_FOLDER_CONTEXT_PREVIEW_BYTES)
+                    # Not final, so a character cut off at the limit is dropped
+                    # rather than treated as invalid UTF-8
+                    content = codecs.getincrementaldecoder('utf-8')().decode(head)
+                    related_files.append({
+                        'path': str(file_info.relative_path),
+                        'content_preview': content,
+                        'size': file_info.size_bytes
+                    })
+                except Exception:
+                    continue
             
             return {
                 'folder_path': str(folder_path),
@@ -595,7 +966,7 @@ class RefactorEngine:
             }
             
         except Exception as e:
-            print(f"Error gathering folder context: {e}")
+            logger.error("Error gathering folder context: %s", e)
             return None
     
     def _get_llm_suggestions_for_syntax_fix(self, code: str, language: str, 
@@ -604,15 +975,12 @@ class RefactorEngine:
         """Get LLM suggestions specifically focused on fixing syntax errors"""
         try:
             # Enhanced prompt for syntax fixing
+            # Fixed instruction ahead of the per-file errors, keeping the prompt prefix stable
             syntax_fix_context = {
                 **context,
                 'task_type': 'syntax_fix',
-                'specific_errors': validation_errors,
-                'instruction': (
-                    "Focus on fixing syntax errors only. "
-                    "Use the folder context to understand imports, dependencies, and patterns. "
-                    "Preserve the original logic and functionality."
-                )
+                'instruction': _SYNTAX_FIX_INSTRUCTION,
+                'specific_errors': validation_errors
             }
             
             suggestions = self.llm_suggestor.get_suggestions(code, language, syntax_fix_context)
@@ -627,7 +995,7 @@ class RefactorEngine:
             return None
             
         except Exception as e:
-            print(f"Error getting syntax fix suggestions: {e}")
+            logger.error("Error getting syntax fix suggestions: %s", e)
             return None
     
     def _apply_syntax_focused_suggestions(self, code: str, language: str, 
@@ -635,62 +1003,65 @@ class RefactorEngine:
                                         result: 'RefactorResult') -> str:
         """Apply LLM suggestions with focus on syntax fixing"""
         try:
-            adapter_class = LANGUAGE_ADAPTERS.get(language)
-            if not adapter_class:
+            adapter = self._get_adapter(language)
+            if adapter is None:
                 result.warnings.append(f"No adapter available for {language} syntax fixing")
                 return code
             
-            adapter = adapter_class()
             current_code = code
             
+            def apply_transform(current: str, transform) -> str:
+                return adapter.apply_transformation(
+                    current,
+                    transform.transformation_type,
+                    transform.location
+                )
+            
+            def transform_failed(transform, e: Exception) -> None:
+                result.suggestions_skipped.append({
+                    'type': 'syntax_fix_transformation',
+                    'suggestion': transform.transformation_type,
+                    'reason': f"Application failed: {e}"
+                })
+            
             # Apply transformations that might fix syntax issues
-            for transform in suggestions.transformations:
-                if transform.safety_level in ['safe', 'moderate']:
-                    try:
-                        new_code = adapter.apply_transformation(
-                            current_code, 
-                            transform.transformation_type,
-                            transform.location
-                        )
-                        if new_code != current_code:
-                            # Validate each step
-                            step_errors = self._validate_syntax(new_code, language)
-                            if not step_errors:  # Only keep changes that don't introduce errors
-                                current_code = new_code
-                                result.transformations_applied.append({
-                                    'type': transform.transformation_type,
-                                    'description': f'Syntax fix: {transform.description}',
-                                    'location': transform.location,
-                                    'confidence': transform.confidence
-                                })
-                    except Exception as e:
-                        result.suggestions_skipped.append({
-                            'type': 'syntax_fix_transformation',
-                            'suggestion': transform.transformation_type,
-                            'reason': f"Application failed: {e}"
-                        })
+            current_code, accepted = self._apply_validated_steps(
+                current_code, language,
+                [t for t in suggestions.transformations if t.safety_level in ['safe', 'moderate']],
+                apply_transform, transform_failed
+            )
+            for transform in accepted:
+                result.transformations_applied.append({
+                    'type': transform.transformation_type,
+                    'description': f'Syntax fix: {transform.description}',
+                    'location': transform.location,
+                    'confidence': transform.confidence
+                })
+            
+            def apply_rename(current: str, rename) -> str:
+                return adapter.apply_rename(current, rename.old_name, rename.new_name)
+            
+            def rename_failed(rename, e: Exception) -> None:
+                result.suggestions_skipped.append({
+                    'type': 'syntax_fix_rename',
+                    'suggestion': f'{rename.old_name} -> {rename.new_name}',
+                    'reason': f"Application failed: {e}"
+                })
             
             # Apply safe renames that might resolve undefined variables
-            for rename in suggestions.renames:
-                if rename.confidence >= 0.8:  # Higher threshold for syntax fixes
-                    try:
-                        new_code = adapter.apply_rename(current_code, rename.old_name, rename.new_name)
-                        if new_code != current_code:
-                            step_errors = self._validate_syntax(new_code, language)
-                            if not step_errors:
-                                current_code = new_code
-                                result.renames_applied.append({
-                                    'old_name': rename.old_name,
-                                    'new_name': rename.new_name,
-                                    'reason': f'Syntax fix: {rename.reason}',
-                                    'confidence': rename.confidence
-                                })
-                    except Exception as e:
-                        result.suggestions_skipped.append({
-                            'type': 'syntax_fix_rename',
-                            'suggestion': f'{rename.old_name} -> {rename.new_name}',
-                            'reason': f"Application failed: {e}"
-                        })
+            # (higher threshold for syntax fixes)
+            current_code, accepted = self._apply_validated_steps(
+                current_code, language,
+                [r for r in suggestions.renames if r.confidence >= 0.8],
+                apply_rename, rename_failed
+            )
+            for rename in accepted:
+                result.renames_applied.append({
+                    'old_name': rename.old_name,
+                    'new_name': rename.new_name,
+                    'reason': f'Syntax fix: {rename.reason}',
+                    'confidence': rename.confidence
+                })
             
             return current_code
             
@@ -698,25 +1069,68 @@ class RefactorEngine:
             result.warnings.append(f"Syntax-focused suggestion application failed: {e}")
             return code
     
+    def _apply_validated_steps(self, code: str, language: str, steps: List[Any],
+                               apply_step: Callable[[str, Any], str],
+                               on_error: Callable[[Any, Exception], None]) -> Tuple[str, List[Any]]:
+        """Apply steps in order, keeping only those that leave the code syntactically valid
+        
+        Steps are applied in batches of up to _SYNTAX_FIX_BATCH_SIZE code-changing
+        steps and only the batch result is validated, so a step that breaks the
+        code is kept when a later step in the same batch repairs it. When the
+        batch result is invalid, bisection finds the first step whose result is
+        invalid; it is dropped, the steps before it are kept, and every step after
+        it is retried against the last valid code, including steps that were
+        no-ops or failed on the discarded intermediate code.
+        """
+        accepted = []
+        pending = deque(steps)
+        while pending:
+            attempts = []
+            states = []
+            current = code
+            while pending and len(states) < _SYNTAX_FIX_BATCH_SIZE:
+                step = pending.popleft()
+                try:
+                    new_code = apply_step(current, step)
+                except Exception as e:
+                    attempts.append((step, e))
+                    continue
+                attempts.append((step, None))
+                if new_code != current:
+                    states.append((len(attempts) - 1, new_code))
+                    current = new_code
+            
+            kept = len(states)
+            done = len(attempts)
+            if states and self._validate_syntax(current, language):
+                # The batch result is known bad; find the first failing state
+                low, high = 0, len(states) - 1
+                while low < high:
+                    mid = (low + high) // 2
+                    if self._validate_syntax(states[mid][1], language):
+                        high = mid
+                    else:
+                        low = mid + 1
+                kept = low
+                done = states[low][0]
+                current = states[low - 1][1] if low else code
+                # Retry the steps after the breaking one against the last good code
+                pending.extendleft(reversed([step for step, _ in attempts[done + 1:]]))
+            
+            for step, error in attempts[:done]:
+                if error is not None:
+                    on_error(step, error)
+            accepted.extend(attempts[position][0] for position, _ in states[:kept])
+            code = current
+        
+        return code, accepted
+    
     def _validate_syntax(self, code: str, language: str) -> List[str]:
         """Validate syntax of refactored code"""
-        errors = []
-        
         try:
-            adapter_class = LANGUAGE_ADAPTERS.get(language)
-            if adapter_class:
-                adapter = adapter_class()
-                if hasattr(adapter, 'validate_syntax'):
-                    is_valid, error_msg = adapter.validate_syntax(code)
-                    if not is_valid:
-                        errors.append(error_msg)
-            else:
-                errors.append(f"No syntax validator available for {language}")
-                
+            return list(_validate_source(language, code))
         except Exception as e:
-            errors.append(f"Syntax validation error: {e}")
-        
-        return errors
+            return [f"Syntax validation error: {e}"]
     
     def _detect_language(self, file_path: Path) -> Optional[str]:
         """Detect programming language from file extension"""
@@ -725,18 +1139,18 @@ class RefactorEngine:
     
     def _count_changed_lines(self, original: str, refactored: str) -> int:
         """Count number of changed lines"""
+        if refactored is original:
+            return 0
+        
         original_lines = original.split('\n')
         refactored_lines = refactored.split('\n')
         
-        changes = 0
-        max_len = max(len(original_lines), len(refactored_lines))
-        
-        for i in range(max_len):
-            orig_line = original_lines[i] if i < len(original_lines) else ""
-            refact_line = refactored_lines[i] if i < len(refactored_lines) else ""
-            
-            if orig_line != refact_line:
-                changes += 1
+        changes = sum(a != b for a, b in zip(original_lines, refactored_lines))
+        # Lines past the end of the shorter side compare against "", so only
+        # non-empty extra lines count as changed
+        shorter = min(len(original_lines), len(refactored_lines))
+        longer = original_lines if len(original_lines) > shorter else refactored_lines
+        changes += sum(1 for line in longer[shorter:] if line)
         
         return changes
     
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Response Cache Module
+
+Persistent cache of LLM responses keyed by a hash of the code and the settings
+that shape the answer, so identical files are not sent to the LLM twice.
+Values are stored as JSON, so reading the cache never executes code.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join("~", ".refactai", "cache")
+DEFAULT_MAX_BYTES = 1 << 30  # 1GB
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable 128-bit key for the given parts (not used for security)"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(str(part).encode('utf-8', errors='surrogatepass'))
+        # Separator so ('ab', 'c') and ('a', 'bc') hash differently
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed key/value store with least-recently-used eviction past max_bytes"""
+    
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        directory = os.path.expanduser(directory)
+        os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "responses.sqlite3"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached JSON value for key, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        
+        try:
+            return json.loads(row[0])
+        except Exception as e:
+            # Written by an incompatible version; drop it
+            logger.debug("Discarding unreadable cache entry %s: %s", key, e)
+            self.delete(key)
+            return None
+    
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value under key, evicting the least recently used entries beyond max_bytes"""
+        data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+    
+    def delete(self, key: str) -> None:
+        """Remove key if present"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+    
+    def _evict(self) -> None:
+        """Drop oldest entries until the total size fits max_bytes (lock held)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+    
+    def close(self) -> None:
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()